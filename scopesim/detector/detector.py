@@ -15,17 +15,55 @@ class Detector(DetectorBase):
         self.meta = {}
         self.meta.update(header)
         self.meta.update(kwargs)
+        # (key, windows) for the last image plane grid seen by extract_from.
+        # DetectorArray hands it on to the next Detector of the same chip
+        self.window_plan = (None, None)
+        # random number generator for the detector effects. None means the
+        # global numpy state, seeded by each effect from !SIM.random.seed
+        self.random_state = None
 
     def extract_from(self, image_plane, spline_order=1, reset=True):
+        """
+        Adds the part of the image plane that falls on the detector
+
+        If the image plane and detector share a pixel grid, the detector
+        window is sliced directly out of the image plane. The window is only
+        computed again if the image plane grid changes. Otherwise the image
+        plane is resampled with ``add_imagehdu_to_imagehdu``.
+        """
         if reset:
             self.reset()
         if not isinstance(image_plane, ImagePlaneBase):
             raise ValueError("image_plane must be an ImagePlane object: {}"
                              "".format(type(image_plane)))
 
-        self._hdu = imp_utils.add_imagehdu_to_imagehdu(image_plane.hdu,
-                                                       self.hdu, spline_order,
-                                                       wcs_suffix="D")
+        is_aligned, windows = self._windows(image_plane.hdu)
+        if not is_aligned:
+            self._hdu = imp_utils.add_imagehdu_to_imagehdu(image_plane.hdu,
+                                                           self.hdu,
+                                                           spline_order,
+                                                           wcs_suffix="D")
+        elif windows is not None:
+            det_window, image_window = windows
+            image = getattr(image_plane.data, "value", image_plane.data)
+            self._hdu.data[det_window] += image[image_window]
+
+    def _windows(self, image_plane_hdu):
+        """Returns (is_aligned, overlay windows), cached per pixel grid"""
+        plane_hdr, det_hdr = image_plane_hdu.header, self._hdu.header
+        key = (image_plane_hdu.data.shape, self._hdu.data.shape,
+               imp_utils.wcs_key(plane_hdr, "D"),
+               imp_utils.wcs_key(det_hdr, "D"))
+        if self.window_plan[0] != key:
+            windows = None
+            is_aligned = imp_utils.is_aligned(plane_hdr, det_hdr, "D")
+            if is_aligned:
+                windows = imp_utils.overlay_windows(
+                    plane_hdr, image_plane_hdu.data.shape, det_hdr,
+                    self._hdu.data.shape, wcs_suffix="D")
+            self.window_plan = (key, (is_aligned, windows))
+
+        return self.window_plan[1]
 
     def reset(self):
         self._hdu.data = np.zeros(self._hdu.data.shape)
@@ -1,5 +1,6 @@
 import logging
 
+import numpy as np
 from astropy.io import fits
 
 from .detector import Detector
@@ -7,6 +8,7 @@ from .detector import Detector
 from ..effects.effects_utils import get_all_effects
 from .. import effects as efs
 from .. import utils
+from ..utils import from_currsys, get_n_workers, parallel_map, OrderedTurns
 
 
 class DetectorArray:
@@ -18,6 +20,8 @@ class DetectorArray:
         self.dtcr_effects = []
         self.detectors = []
         self.latest_exposure = None
+        # where each detector lies on the image plane, kept across readouts
+        self.window_plans = []
 
     def readout(self, image_planes, array_effects=[], dtcr_effects=[], **kwargs):
         """
@@ -34,6 +38,17 @@ class DetectorArray:
         dtcr_effects : list of Effect objects
             A list of effects related to the detectors
 
+        Notes
+        -----
+        If ``!SIM.computing.parallel_readout`` is True, the detectors are read
+        out on ``!SIM.computing.n_workers`` threads. Each detector then draws
+        its noise from its own random stream, spawned from
+        ``!SIM.random.seed``, so that the readout is reproducible regardless
+        of the number of workers. Each detector effect still receives the
+        detectors one at a time and in list order, unless its
+        ``meta["parallel_detectors"]`` is True. The HDUList is always in
+        detector order.
+
         Returns
         -------
         self.latest_exposure : fits.HDUList
@@ -70,17 +85,58 @@ class DetectorArray:
         # 1. make a series of Detectors for each row in a DetectorList object
         self.detectors = [Detector(hdr, **self.meta)
                           for hdr in self.detector_list.detector_headers()]
-
-        # 2. iterate through all Detectors, extract image from image_plane
-        for detector in self.detectors:
-            detector.extract_from(image_plane)
-
-            # 3. apply all effects (to all Detectors)
-            for effect in self.dtcr_effects:
-                detector = effect.apply_to(detector)
-
-            # 4. add necessary header keywords
-            # .. todo: add keywords
+        if len(self.window_plans) == len(self.detectors):
+            for detector, plan in zip(self.detectors, self.window_plans):
+                detector.window_plan = plan
+
+        n_workers = 1
+        if from_currsys("!SIM.computing.parallel_readout") is True:
+            n_workers = get_n_workers()
+            seeds = np.random.SeedSequence(from_currsys("!SIM.random.seed"))
+            for detector, seed in zip(self.detectors,
+                                      seeds.spawn(len(self.detectors))):
+                detector.random_state = np.random.RandomState(
+                    np.random.MT19937(seed))
+
+        # Effects that declare ``meta["parallel_detectors"]`` are stateless
+        # with respect to the detectors and may be applied to several at once
+        turns = [OrderedTurns() if n_workers > 1 and not from_currsys(
+                     effect.meta.get("parallel_detectors", False)) else None
+                 for effect in self.dtcr_effects]
+
+        def _readout_detector(i_detector):
+            i, detector = i_detector
+            n_done = 0
+            try:
+                # 2. extract image from image_plane
+                detector.extract_from(image_plane)
+
+                # 3. apply all effects
+                for effect, turn in zip(self.dtcr_effects, turns):
+                    n_done += 1
+                    if turn is None:
+                        detector = effect.apply_to(detector)
+                    else:
+                        with turn(i):
+                            detector = effect.apply_to(detector)
+
+                # 4. add necessary header keywords
+                # .. todo: add keywords
+            finally:
+                # let the following detectors pass, even if this one failed
+                for turn in turns[n_done:]:
+                    if turn is not None:
+                        turn.release(i)
+
+            return detector
+
+        # 2.-4. iterate through all Detectors
+        self.detectors = list(parallel_map(_readout_detector,
+                                           enumerate(self.detectors),
+                                           n_workers))
+
+        self.window_plans = [detector.window_plan
+                             for detector in self.detectors]
 
         # 5. Generate a HDUList with the ImageHDUs and any extras:
         pri_hdu = make_primary_hdu(self.meta)
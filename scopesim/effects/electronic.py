@@ -16,6 +16,7 @@ Classes:
 - Bias - adds constant bias level to readout
 
 Functions:
+- get_random_state
 - make_ron_frame
 - pseudo_random_field
 """
@@ -232,7 +233,8 @@ class SummedExposure(Effect):
     """
     def __init__(self, **kwargs):
         super(SummedExposure, self).__init__(**kwargs)
-        params = {"z_order": [860]}
+        params = {"z_order": [860],
+                  "parallel_detectors": True}
         self.meta.update(params)
         self.meta.update(kwargs)
 
@@ -256,7 +258,8 @@ class Bias(Effect):
     """
     def __init__(self, **kwargs):
         super(Bias, self).__init__(**kwargs)
-        params = {"z_order": [855]}
+        params = {"z_order": [855],
+                  "parallel_detectors": True}
         self.meta.update(params)
         self.meta.update(kwargs)
 
@@ -279,6 +282,7 @@ class PoorMansHxRGReadoutNoise(Effect):
                   "line_fraction": 0.25,
                   "channel_fraction": 0.05,
                   "random_seed": "!SIM.random.seed",
+                  "parallel_detectors": True,
                   "report_plot_include": False,
                   "report_table_include": False}
         self.meta.update(params)
@@ -290,8 +294,7 @@ class PoorMansHxRGReadoutNoise(Effect):
     def apply_to(self, det, **kwargs):
         if isinstance(det, DetectorBase):
             self.meta["random_seed"] = from_currsys(self.meta["random_seed"])
-            if self.meta["random_seed"] is not None:
-                np.random.seed(self.meta["random_seed"])
+            rng = get_random_state(det, self.meta["random_seed"])
 
             from_currsys(self.meta)
             ron_keys = ["noise_std", "n_channels", "channel_fraction",
@@ -299,11 +302,11 @@ class PoorMansHxRGReadoutNoise(Effect):
             ron_kwargs = {key: self.meta[key] for key in ron_keys}
             ron_kwargs["image_shape"] = det._hdu.data.shape
 
-            ron_frame = make_ron_frame(**ron_kwargs)
+            ron_frame = make_ron_frame(**ron_kwargs, random_state=rng)
             stacked_ron_frame = np.zeros_like(ron_frame)
             for i in range(self.meta["ndit"]):
-                dx = np.random.randint(0, ron_frame.shape[1])
-                dy = np.random.randint(0, ron_frame.shape[0])
+                dx = rng.randint(0, ron_frame.shape[1])
+                dy = rng.randint(0, ron_frame.shape[0])
                 stacked_ron_frame += np.roll(ron_frame, (dy, dx), axis=(0, 1))
 
             # .. todo: this .T is ugly. Work out where things are getting switched and remove it!
@@ -326,6 +329,7 @@ class BasicReadoutNoise(Effect):
         super(BasicReadoutNoise, self).__init__(**kwargs)
         self.meta["z_order"] = [811]
         self.meta["random_seed"] = "!SIM.random.seed"
+        self.meta["parallel_detectors"] = True
         self.meta.update(kwargs)
 
         self.required_keys = ["noise_std", "ndit"]
@@ -338,10 +342,9 @@ class BasicReadoutNoise(Effect):
             noise_std = ron * np.sqrt(float(ndit))
 
             random_seed = from_currsys(self.meta["random_seed"])
-            if random_seed is not None:
-                np.random.seed(random_seed)
-            det._hdu.data += np.random.normal(loc=0, scale=noise_std,
-                                              size=det._hdu.data.shape)
+            rng = get_random_state(det, random_seed)
+            det._hdu.data += rng.normal(loc=0, scale=noise_std,
+                                        size=det._hdu.data.shape)
 
         return det
 
@@ -359,13 +362,13 @@ class ShotNoise(Effect):
         super(ShotNoise, self).__init__(**kwargs)
         self.meta["z_order"] = [820]
         self.meta["random_seed"] = "!SIM.random.seed"
+        self.meta["parallel_detectors"] = True
         self.meta.update(kwargs)
 
     def apply_to(self, det, **kwargs):
         if isinstance(det, DetectorBase):
             self.meta["random_seed"] = from_currsys(self.meta["random_seed"])
-            if self.meta["random_seed"] is not None:
-                np.random.seed(self.meta["random_seed"])
+            rng = get_random_state(det, self.meta["random_seed"])
 
             # ! poisson(x) === normal(mu=x, sigma=x**0.5)
             # Windows has a problem with generating poisson values above 2**30
@@ -382,8 +385,8 @@ class ShotNoise(Effect):
 
             below = data < 2**20
             above = np.invert(below)
-            data[below] = np.random.poisson(data[below]).astype(float)
-            data[above] = np.random.normal(data[above], np.sqrt(data[above]))
+            data[below] = rng.poisson(data[below]).astype(float)
+            data[above] = rng.normal(data[above], np.sqrt(data[above]))
             data = np.floor(data)
             new_imagehdu = fits.ImageHDU(data=data, header=det._hdu.header)
             det._hdu = new_imagehdu
@@ -406,6 +409,7 @@ class DarkCurrent(Effect):
     def __init__(self, **kwargs):
         super(DarkCurrent, self).__init__(**kwargs)
         self.meta["z_order"] = [830]
+        self.meta["parallel_detectors"] = True
 
         required_keys = ["value", "dit", "ndit"]
         utils.check_keys(self.meta, required_keys, action="error")
@@ -474,6 +478,7 @@ class LinearityCurve(Effect):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         params = {"z_order": [840],
+                  "parallel_detectors": True,
                   "report_plot_include": True,
                   "report_table_include": False}
         self.meta.update(params)
@@ -544,6 +549,7 @@ class BinnedImage(Effect):
     def __init__(self, **kwargs):
         super(BinnedImage, self).__init__(**kwargs)
         self.meta["z_order"] = [870]
+        self.meta["parallel_detectors"] = True
 
         self.required_keys = ["bin_size"]
         utils.check_keys(self.meta, self.required_keys, action="error")
@@ -562,6 +568,7 @@ class UnequalBinnedImage(Effect):
     def __init__(self, **kwargs):
         super(UnequalBinnedImage, self).__init__(**kwargs)
         self.meta["z_order"] = [870]
+        self.meta["parallel_detectors"] = True
 
         self.required_keys = ["binx","biny"]
         utils.check_keys(self.meta, self.required_keys, action="error")
@@ -580,36 +587,67 @@ class UnequalBinnedImage(Effect):
 ################################################################################
 
 
+def get_random_state(det, random_seed=None):
+    """
+    Returns the random number generator for the effects on a detector
+
+    If the detector has its own ``random_state`` (see
+    ``!SIM.computing.parallel_readout``), this is returned as is. Otherwise the
+    global numpy state is seeded with ``random_seed`` (if not None) and the
+    ``np.random`` module is returned.
+
+    Parameters
+    ----------
+    det : Detector
+    random_seed : int, optional
+
+    Returns
+    -------
+    rng : np.random.RandomState, module
+
+    """
+    rng = getattr(det, "random_state", None)
+    if rng is None:
+        if random_seed is not None:
+            np.random.seed(random_seed)
+        rng = np.random
+
+    return rng
+
+
 def make_ron_frame(image_shape, noise_std, n_channels, channel_fraction,
-                   line_fraction, pedestal_fraction, read_fraction):
+                   line_fraction, pedestal_fraction, read_fraction,
+                   random_state=np.random):
     shape = image_shape
     w_chan = max(1, shape[0] // n_channels)
+    rng = random_state
 
     pixel_std = noise_std * (pedestal_fraction + read_fraction)**0.5
     line_std = noise_std * line_fraction**0.5
     if shape < (1024, 1024):
-        pixel = np.random.normal(loc=0, scale=pixel_std, size=shape)
-        line = np.random.normal(loc=0, scale=line_std, size=shape[1])
+        pixel = rng.normal(loc=0, scale=pixel_std, size=shape)
+        line = rng.normal(loc=0, scale=line_std, size=shape[1])
     else:
-        pixel = pseudo_random_field(scale=pixel_std, size=shape)
+        pixel = pseudo_random_field(scale=pixel_std, size=shape,
+                                    random_state=rng)
         line = pixel[0]
 
     channel_std = noise_std * channel_fraction**0.5
-    channel = np.repeat(np.random.normal(loc=0, scale=channel_std,
-                                         size=n_channels), w_chan + 1, axis=0)
+    channel = np.repeat(rng.normal(loc=0, scale=channel_std,
+                                   size=n_channels), w_chan + 1, axis=0)
 
     ron_frame = (pixel + line).T + channel[:shape[0]]
 
     return ron_frame
 
 
-def pseudo_random_field(scale=1, size=(1024, 1024)):
+def pseudo_random_field(scale=1, size=(1024, 1024), random_state=np.random):
     n = 256
     image = np.zeros(size)
-    batch = np.random.normal(loc=0, scale=scale, size=(2*n, 2*n))
+    batch = random_state.normal(loc=0, scale=scale, size=(2*n, 2*n))
     for y in range(0, size[1], n):
         for x in range(0, size[0], n):
-            i, j = np.random.randint(n, size=2)
+            i, j = random_state.randint(n, size=2)
             dx, dy = min(size[0]-x, n), min(size[1]-y, n)
             image[x:x+dx, y:y+dy] = batch[i:i+dx, j:j+dy]
 
@@ -1,7 +1,7 @@
 """SpectralTraceList and SpectralTrace for the METIS LM spectrograph"""
+import threading
 from copy import deepcopy
 import numpy as np
-from scipy.interpolate import RectBivariateSpline
 
 from astropy.io import fits
 from astropy.io import ascii as ioascii
@@ -9,10 +9,13 @@ from astropy.table import Table
 from astropy.wcs import WCS
 from astropy import units as u
 
-from ..utils import from_currsys, find_file, quantify
+from ..utils import from_currsys, find_file, quantify, get_n_workers, \
+    parallel_map
 from .spectral_trace_list import SpectralTraceList
 from .spectral_trace_list_utils import SpectralTrace
 from .spectral_trace_list_utils import Transform2D
+from .spectral_trace_list_utils import bilinear_sampler, \
+    apply_bilinear_sampler
 from .apertures import ApertureMask
 from .ter_curves import TERCurve
 from ..base_classes import FieldOfViewBase, FOVSetupBase
@@ -39,6 +42,10 @@ class MetisLMSSpectralTraceList(SpectralTraceList):
 
         self.wavelen = self.meta['wavelen']
 
+        # Bilinear sampling operators of the FOV cube, one per slice
+        self._slice_samplers = {}
+        self._samplers_lock = threading.Lock()
+
         # field of view of the instrument
         # ..todo: get this from aperture list
 
@@ -99,7 +106,8 @@ class MetisLMSSpectralTraceList(SpectralTraceList):
                                 dtype=np.float32)
 
 
-            for sptid, spt in self.spectral_traces.items():
+            def _map_slice(sptid_spt):
+                sptid, spt = sptid_spt
                 ymin = spt.meta['fov']['y_min']
                 ymax = spt.meta['fov']['y_max']
 
@@ -111,18 +119,25 @@ class MetisLMSSpectralTraceList(SpectralTraceList):
                 slicewcs.wcs.cdelt[1] = (ymax - ymin) / ny_slice / 3600
                 slicewcs_spat = slicewcs.sub(2)
 
-                # World coordinates for the slice
-                xworld, yworld = slicewcs_spat.all_pix2world(xslice,
-                                                             yslice, 0)
-                # FOV pixel coordinates for the slice
-                xfov, yfov = fovwcs_spat.all_world2pix(xworld, yworld, 0)
-
-                slicecube = np.zeros((n_z, ny_slice, n_x))
-                for islice in range(n_z):
-                    ifov = RectBivariateSpline(np.arange(n_y),
-                                               np.arange(n_x),
-                                               fovcube[islice], kx=1, ky=1)
-                    slicecube[islice] = ifov(yfov, xfov, grid=False)
+                # The sampling of the FOV cube only depends on the spatial
+                # WCS of the cube, so it is kept for repeated observations
+                key = (fovwcs_spat.to_header_string(), n_y, n_x, ny_slice,
+                       ymin, ymax)
+                with self._samplers_lock:
+                    cached = self._slice_samplers.get(sptid)
+                if cached is not None and cached[0] == key:
+                    sampler = cached[1]
+                else:
+                    # World coordinates for the slice
+                    xworld, yworld = slicewcs_spat.all_pix2world(xslice,
+                                                                 yslice, 0)
+                    # FOV pixel coordinates for the slice
+                    xfov, yfov = fovwcs_spat.all_world2pix(xworld, yworld, 0)
+                    sampler = bilinear_sampler(n_y, n_x, yfov, xfov)
+                    with self._samplers_lock:
+                        self._slice_samplers[sptid] = (key, sampler)
+
+                slicecube = apply_bilinear_sampler(fovcube, sampler)
 
                 slicefov = FieldOfView(obj.header,
                                        [obj.meta['wave_min'], obj.meta['wave_max']])
@@ -133,13 +148,22 @@ class MetisLMSSpectralTraceList(SpectralTraceList):
                 slicefov.cube = fits.ImageHDU(header=slicewcs.to_header(),
                                               data=slicecube)
                 #slicefov.cube.writeto(f"slicefov_{sptid}.fits", overwrite=True)
-                slicefov.hdu = spt.map_spectra_to_focal_plane(slicefov)
-
-                sxmin = slicefov.hdu.header['XMIN']
-                sxmax = slicefov.hdu.header['XMAX']
-                symin = slicefov.hdu.header['YMIN']
-                symax = slicefov.hdu.header['YMAX']
-                fovimage[symin:symax, sxmin:sxmax] += slicefov.hdu.data
+                return spt.map_spectra_to_focal_plane(slicefov)
+
+            # The slices may be mapped concurrently, but their images are
+            # always added to the FOV image in slice order. If the FOVs are
+            # already mapped on a pool of threads, parallel_map maps the
+            # slices serially
+            n_workers = get_n_workers() if from_currsys(
+                self.meta["parallel_traces"]) else 1
+            for slice_hdu in parallel_map(_map_slice,
+                                          self.spectral_traces.items(),
+                                          n_workers):
+                sxmin = slice_hdu.header['XMIN']
+                sxmax = slice_hdu.header['XMAX']
+                symin = slice_hdu.header['YMIN']
+                symax = slice_hdu.header['YMAX']
+                fovimage[symin:symax, sxmin:sxmax] += slice_hdu.data
 
             obj.hdu = fits.ImageHDU(data=fovimage, header=obj.detector_header)
 
@@ -1,5 +1,11 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 from scipy import ndimage as spi
+from scipy import fft as sp_fft
+from scipy.signal import convolve as sp_convolve, choose_conv_method
 from scipy.interpolate import RectBivariateSpline, griddata
 from scipy.ndimage import zoom
 from astropy import units as u
@@ -305,3 +311,262 @@ def get_bkg_level(obj, bg_w):
     else:
         raise ValueError("Unsupported dimension:", obj.ndim)
     return bkg_level
+
+
+class KernelFFTCache:
+    """
+    A least-recently-used cache of kernel spectra
+
+    Entries are keyed by the kernel content (not the object identity, as
+    kernels are often copied before convolution) and the padded FFT shape.
+    The same instance can be shared by several threads convolving FOVs.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of kernel spectra to keep
+
+    """
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kernel, fft_shape):
+        """Returns ``rfftn(kernel, fft_shape)``, computing it only if needed"""
+        kernel = np.ascontiguousarray(kernel)
+        key = (kernel.shape, kernel.dtype.str, tuple(fft_shape),
+               hashlib.sha1(kernel.view(np.uint8)).hexdigest())
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+
+        kernel_fft = sp_fft.rfftn(kernel, fft_shape)
+        if self.max_size > 0:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = kernel_fft
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+        return kernel_fft
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+def get_convolution_method(image_shape, kernel_shape, mode="same",
+                           max_fft_size=2**26):
+    """
+    Chooses a 2D convolution method for the given array shapes
+
+    Small kernels are convolved directly, larger kernels via FFT. Overlap-add
+    is used if the kernel is much smaller than the image (block-wise FFTs are
+    then faster), or if a single padded FFT would exceed ``max_fft_size``
+    elements and the kernel is still small compared to the image.
+
+    Parameters
+    ----------
+    image_shape, kernel_shape : tuple of int
+        The convolution acts on the last two axes. Any leading image axes
+        (e.g. the wavelength axis of a cube) only count towards the FFT size
+    mode : str
+        ["same", "full"]
+    max_fft_size : int
+        Maximum number of elements in a full padded FFT
+
+    Returns
+    -------
+    method : str
+        ["direct", "fft", "oa"]
+
+    """
+    image_2d, kernel_2d = tuple(image_shape[-2:]), tuple(kernel_shape[-2:])
+    method = choose_conv_method(np.broadcast_to(0., image_2d),
+                                np.broadcast_to(0., kernel_2d), mode=mode)
+    if method == "fft":
+        ratio = min(ni / nk for ni, nk in zip(image_2d, kernel_2d))
+        fft_size = np.prod(image_shape[:-2], dtype=int) * \
+                   np.prod([ni + nk - 1 for ni, nk in zip(image_2d, kernel_2d)])
+        if ratio >= 32 or (ratio >= 8 and fft_size > max_fft_size):
+            method = "oa"
+
+    return method
+
+
+def convolve(image, kernel, mode="same", method="auto", fft_cache=None):
+    """
+    Convolves an image or the planes of a cube with a 2D kernel
+
+    Parameters
+    ----------
+    image : np.ndarray
+        2D image or 3D cube. Cubes are convolved plane by plane
+    kernel : np.ndarray
+        2D kernel
+    mode : str
+        ["same", "full"] As for ``scipy.signal.convolve``
+    method : str
+        ["auto", "direct", "fft", "oa"]. "oa" is overlap-add. "auto" chooses
+        the method based on the image and kernel shapes
+    fft_cache : KernelFFTCache, optional
+        If given, kernel spectra are reused from (and stored in) this cache
+
+    Returns
+    -------
+    new_image : np.ndarray
+
+    """
+    if mode not in ["same", "full"]:
+        raise ValueError(f"mode must be either 'same' or 'full': {mode}")
+    if kernel.ndim != 2 or image.ndim not in (2, 3):
+        raise ValueError(f"Unsupported dimensions: image {image.ndim}D, "
+                         f"kernel {kernel.ndim}D")
+
+    if method == "auto":
+        method = get_convolution_method(image.shape, kernel.shape, mode)
+    if fft_cache is None:
+        fft_cache = KernelFFTCache(max_size=0)
+
+    if method == "direct":
+        kernel = kernel[None, :, :] if image.ndim == 3 else kernel
+        new_image = sp_convolve(image, kernel, mode=mode, method="direct")
+    elif method == "fft":
+        new_image = _fft_convolve(image, kernel, fft_cache)
+    elif method == "oa":
+        new_image = _overlap_add_convolve(image, kernel, fft_cache)
+    else:
+        raise ValueError(f"Unknown convolution method: {method}")
+
+    if mode == "same" and method != "direct":
+        new_image = _centred(new_image, image.shape)
+
+    return new_image
+
+
+def get_mask_window(mask, kernel_shape):
+    """
+    Returns the region where a "same"-mode convolution of a mask is non-zero
+
+    Parameters
+    ----------
+    mask : np.ndarray
+        2D boolean or numerical mask
+    kernel_shape : tuple of int
+
+    Returns
+    -------
+    window : tuple of slices, None
+        (y_slice, x_slice) in the mask pixel coordinates, or None if the mask
+        is empty
+
+    """
+    window = []
+    for axis, (n, k) in enumerate(zip(mask.shape, kernel_shape)):
+        filled = np.flatnonzero(np.any(mask, axis=1 - axis))
+        if len(filled) == 0:
+            return None
+        c = (k - 1) // 2
+        window += [slice(max(0, filled[0] - c), min(n, filled[-1] + k - c))]
+
+    return tuple(window)
+
+
+def convolve_window(image, kernel, window, **kwargs):
+    """
+    Returns a window of the "same"-mode convolution of a 2D image
+
+    Only the part of the image within reach of the kernel is convolved, so the
+    cost scales with the size of the window, not of the full image. The
+    result is the same as ``convolve(image, kernel, mode="same")[window]``.
+
+    Parameters
+    ----------
+    image, kernel : np.ndarray
+        2D arrays
+    window : tuple of slices
+        (y_slice, x_slice) of the output, e.g. from ``get_mask_window``
+    kwargs
+        Passed to ``convolve``, e.g. ``method`` and ``fft_cache``
+
+    Returns
+    -------
+    new_image : np.ndarray
+        The convolved window
+
+    """
+    cuts, crops = [], []
+    for sl, n, k in zip(window, image.shape, kernel.shape):
+        c = (k - 1) // 2
+        i0, i1 = max(0, sl.start - (k - 1 - c)), min(n, sl.stop + c)
+        cuts += [slice(i0, i1)]
+        crops += [slice(sl.start - i0 + c, sl.stop - i0 + c)]
+
+    new_image = convolve(image[tuple(cuts)], kernel, mode="full", **kwargs)
+
+    return new_image[tuple(crops)]
+
+
+def _fft_convolve(image, kernel, fft_cache):
+    """Full 2D convolution over the last two axes via one padded FFT"""
+    full_shape = [ni + nk - 1 for ni, nk in zip(image.shape[-2:], kernel.shape)]
+    fft_shape = [sp_fft.next_fast_len(n, real=True) for n in full_shape]
+
+    kernel_fft = fft_cache.get(kernel, fft_shape)
+    image_fft = sp_fft.rfftn(image, fft_shape, axes=(-2, -1))
+    new_image = sp_fft.irfftn(image_fft * kernel_fft, fft_shape, axes=(-2, -1))
+
+    return new_image[..., :full_shape[0], :full_shape[1]]
+
+
+def _overlap_add_convolve(image, kernel, fft_cache):
+    """
+    Full 2D convolution over the last two axes via overlap-add
+
+    The image is cut into blocks with an FFT size of roughly 8 times the
+    kernel size. Each row of blocks is transformed in one batch and added back
+    onto the output canvas, so only one row of block spectra is held in
+    memory at any time.
+    """
+    (ny, nx), (ky, kx) = image.shape[-2:], kernel.shape
+    fy, fx = [sp_fft.next_fast_len(max(8 * nk, 64), real=True)
+              for nk in (ky, kx)]
+    sy, sx = fy - ky + 1, fx - kx + 1              # block step sizes
+    nby, nbx = -(-ny // sy), -(-nx // sx)          # number of blocks
+
+    lead = image.shape[:-2]
+    kernel_fft = fft_cache.get(kernel, (fy, fx))
+    canvas = np.zeros(lead + ((nby - 1) * sy + fy, (nbx - 1) * sx + fx))
+    for iy in range(nby):
+        row = image[..., iy * sy:(iy + 1) * sy, :]
+        padding = [(0, 0)] * len(lead) + [(0, sy - row.shape[-2]),
+                                          (0, nbx * sx - nx)]
+        blocks = np.pad(row, padding).reshape(lead + (sy, nbx, sx))
+        blocks = np.moveaxis(blocks, -2, -3)       # (..., nbx, sy, sx)
+
+        blocks_fft = sp_fft.rfftn(blocks, (fy, fx), axes=(-2, -1))
+        blocks = sp_fft.irfftn(blocks_fft * kernel_fft, (fy, fx), axes=(-2, -1))
+
+        for ix in range(nbx):
+            canvas[..., iy * sy:iy * sy + fy,
+                   ix * sx:ix * sx + fx] += blocks[..., ix, :, :]
+
+    return canvas[..., :ny + ky - 1, :nx + kx - 1]
+
+
+def _centred(arr, shape):
+    """Returns the centre of ``arr`` along the last two axes, as scipy does"""
+    ny, nx = shape[-2:]
+    y0 = (arr.shape[-2] - ny) // 2
+    x0 = (arr.shape[-1] - nx) // 2
+
+    return arr[..., y0:y0 + ny, x0:x0 + nx]
@@ -1,6 +1,6 @@
 from copy import deepcopy
+import threading
 import numpy as np
-from scipy.signal import convolve
 from scipy.interpolate import RectBivariateSpline
 
 from astropy import units as u
@@ -40,17 +40,25 @@ class PSF(Effect):
                   "sub_pixel_flag": "!SIM.sub_pixel.flag",
                   "z_order": [40, 640],
                   "convolve_mode": "same",      # "full", "same"
+                  "convolve_method": "auto",    # "direct", "fft", "oa"
+                  "kernel_fft_cache_size": 8,
                   "bkg_width": -1,
                   "wave_key": "WAVE0",
                   "normalise_kernel": True,
                   "rotational_blur_angle": 0,
                   "report_plot_include": True,
                   "report_table_include": False,
+                  "parallel_fovs": True,
                   }
         self.meta.update(params)
         self.meta.update(kwargs)
         self.meta = utils.from_currsys(self.meta)
         self.convolution_classes = (FieldOfViewBase, ImagePlaneBase)
+        self._kernel_fft_cache = pu.KernelFFTCache(
+            max_size=self.meta["kernel_fft_cache_size"])
+        # get_kernel keeps the current kernel on the effect. Only one FOV may
+        # fetch its kernel at a time, the convolutions can run in parallel
+        self._kernel_lock = threading.Lock()
 
     def apply_to(self, obj, **kwargs):
         """Apply the PSF"""
@@ -66,7 +74,8 @@ class PSF(Effect):
         elif isinstance(obj, self.convolution_classes):
             if ((hasattr(obj, "fields") and len(obj.fields) > 0) or
                 (obj.hdu is not None)):
-                kernel = self.get_kernel(obj).astype(float)
+                with self._kernel_lock:
+                    kernel = self.get_kernel(obj).astype(float)
 
                 # apply rotational blur for field-tracking observations
                 rot_blur_angle = self.meta["rotational_blur_angle"]
@@ -85,20 +94,27 @@ class PSF(Effect):
                 bkg_level = pu.get_bkg_level(image, self.meta["bkg_width"])
 
                 # do the convolution
+                # kernel spectra are cached, so repeated FOVs at the same
+                # wavelength don't need to transform the kernel again
                 mode = utils.from_currsys(self.meta["convolve_mode"])
+                method = utils.from_currsys(self.meta["convolve_method"])
+                conv_kwargs = {"mode": mode, "method": method,
+                               "fft_cache": self._kernel_fft_cache}
 
                 if image.ndim == 2 and kernel.ndim == 2:
-                    new_image = convolve(image - bkg_level, kernel, mode=mode)
+                    new_image = pu.convolve(image - bkg_level, kernel,
+                                            **conv_kwargs)
                 elif image.ndim == 3 and kernel.ndim == 2:
-                    kernel = kernel[None, :, :]
                     bkg_level = bkg_level[:, None, None]
-                    new_image = convolve(image - bkg_level, kernel, mode=mode)
+                    new_image = pu.convolve(image - bkg_level, kernel,
+                                            **conv_kwargs)
                 elif image.ndim == 3 and kernel.ndim == 3:
                     bkg_level = bkg_level[:, None, None]
                     new_image = np.zeros(image.shape)  # assumes mode="same"
                     for iplane in range(image.shape[0]):
-                        new_image[iplane,] = convolve(image[iplane,] - bkg_level[iplane,],
-                                                      kernel[iplane,], mode=mode)
+                        new_image[iplane,] = pu.convolve(
+                            image[iplane,] - bkg_level[iplane,],
+                            kernel[iplane,], **conv_kwargs)
 
                 obj.hdu.data = new_image + bkg_level
 
@@ -730,8 +746,13 @@ class FieldVaryingPSF(DiscretePSF):
 
                 # Get the kernels that cover this fov, and their respective masks.
                 # Kernels and masks are returned by .get_kernel as a list of tuples.
-                canvas = None
-                kernels_masks = self.get_kernel(fov)
+                image = fov.image.astype(float)
+                canvas = np.zeros(image.shape)
+                conv_kwargs = {"method": self.meta["convolve_method"],
+                               "fft_cache": self._kernel_fft_cache}
+                with self._kernel_lock:
+                    kernels_masks = [[np.array(kernel, dtype=float), mask]
+                                     for kernel, mask in self.get_kernel(fov)]
                 for kernel, mask in kernels_masks:
 
                     # renormalise the kernel if needs be
@@ -739,20 +760,24 @@ class FieldVaryingPSF(DiscretePSF):
                     sum_kernel = np.sum(kernel)
                     if abs(sum_kernel - 1) > self.meta["flux_accuracy"]:
                         kernel /= sum_kernel
-
-                    # image convolution
-                    image = fov.image.astype(float)
                     kernel = kernel.astype(float)
-                    new_image = convolve(image, kernel, mode="same")
-                    if canvas is None:
-                        canvas = np.zeros(new_image.shape)
-
-                    # mask convolution + combine with convolved image
-                    if mask is not None:
-                        new_mask = convolve(mask, kernel, mode="same")
-                        canvas += new_image * new_mask
-                    else:
-                        canvas = new_image
+
+                    if mask is None:
+                        canvas = pu.convolve(image, kernel, mode="same",
+                                             **conv_kwargs)
+                        continue
+
+                    # The convolved mask is only non-zero within the zone's
+                    # bounding box plus the kernel margin. Only convolve the
+                    # image and the mask inside this window
+                    window = pu.get_mask_window(mask, kernel.shape)
+                    if window is None:
+                        continue
+                    new_image = pu.convolve_window(image, kernel, window,
+                                                   **conv_kwargs)
+                    new_mask = pu.convolve_window(mask.astype(float), kernel,
+                                                  window, **conv_kwargs)
+                    canvas[window] += new_image * new_mask
 
                 # reset WCS header info
                 new_shape = canvas.shape
@@ -12,7 +12,7 @@ from astropy.io import fits
 from astropy.table import Table
 
 from .effects import Effect
-from .spectral_trace_list_utils import SpectralTrace
+from .spectral_trace_list_utils import SpectralTrace, TraceMapCache
 from ..utils import from_currsys, check_keys, interp2
 from ..optics.image_plane_utils import header_from_list_of_xy
 from ..base_classes import FieldOfViewBase, FOVSetupBase
@@ -107,6 +107,10 @@ class SpectralTraceList(Effect):
                   "center_on_wave_mid": False,
                   "dwave": 0.002,  # [um] for finding the best fit dispersion
                   "invalid_value": None,  # for dodgy trace file values
+                  "map_cache_size": "!SIM.computing.trace_map_cache_size",
+                  "parallel_traces": "!SIM.computing.parallel_traces",
+                  "fit_cache_path": "!SIM.file.trace_fit_cache_path",
+                  "parallel_fovs": "!SIM.computing.parallel_traces",
                   "report_plot_include": True,
                   "report_table_include": False,
                   }
@@ -119,6 +123,12 @@ class SpectralTraceList(Effect):
         if self._file is not None:
             self.make_spectral_traces()
 
+            # All traces share one cache of focal-plane maps
+            self.map_cache = TraceMapCache(
+                max_size=from_currsys(self.meta["map_cache_size"]))
+            for spt in self.spectral_traces.values():
+                spt.map_cache = self.map_cache
+
     def make_spectral_traces(self):
         """Returns a dictionary of spectral traces read in from a file"""
         self.ext_data = self._file[0].header["EDATA"]
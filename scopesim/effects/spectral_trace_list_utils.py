@@ -5,7 +5,12 @@ This module contains
    - utility functions for use with spectral traces
 """
 
+import os
 import logging
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 
 import numpy as np
 
@@ -48,6 +53,8 @@ class SpectralTrace:
                      "extension_id": 2,
                      "spline_order": 4,
                      "pixel_size": None,
+                     "map_cache_size": 128,     # MB
+                     "fit_cache_path": None,
                      "description": "<no description>"}
 
     def __init__(self, trace_tbl, **kwargs):
@@ -58,6 +65,10 @@ class SpectralTrace:
         self.meta.update(self._class_params)
         self.meta.update(kwargs)
 
+        # SpectralTraceList replaces this with a cache shared by all traces
+        self.map_cache = TraceMapCache(
+            max_size=from_currsys(self.meta["map_cache_size"]))
+
         if isinstance(trace_tbl, (fits.BinTableHDU, fits.TableHDU)):
             self.table = Table.read(trace_tbl)
             self.meta["trace_id"] = trace_tbl.header.get('EXTNAME', "<unknown trace id>")
@@ -117,12 +128,24 @@ class SpectralTrace:
         self.wave_min = quantify(np.min(lam_arr), u.um).value
         self.wave_max = quantify(np.max(lam_arr), u.um).value
 
-        self.xy2xi = Transform2D.fit(x_arr, y_arr, xi_arr)
-        self.xy2lam = Transform2D.fit(x_arr, y_arr, lam_arr)
-        self.xilam2x = Transform2D.fit(xi_arr, lam_arr, x_arr)
-        self.xilam2y = Transform2D.fit(xi_arr, lam_arr, y_arr)
-        self._xiy2x = Transform2D.fit(xi_arr, y_arr, x_arr)
-        self._xiy2lam = Transform2D.fit(xi_arr, y_arr, lam_arr)
+        # The fitted matrices only depend on the table content, so they can
+        # be loaded from a disk cache instead of being refitted
+        fit_args = {"xy2xi": (x_arr, y_arr, xi_arr),
+                    "xy2lam": (x_arr, y_arr, lam_arr),
+                    "xilam2x": (xi_arr, lam_arr, x_arr),
+                    "xilam2y": (xi_arr, lam_arr, y_arr),
+                    "_xiy2x": (xi_arr, y_arr, x_arr),
+                    "_xiy2lam": (xi_arr, y_arr, lam_arr)}
+        cache_path = from_currsys(self.meta["fit_cache_path"])
+        key = trace_fit_key([x_arr, y_arr, xi_arr, lam_arr])
+        matrices = load_trace_fits(cache_path, key)
+        if matrices is None or set(matrices) != set(fit_args):
+            matrices = {name: Transform2D.fit(*args).matrix
+                        for name, args in fit_args.items()}
+            save_trace_fits(cache_path, key, matrices)
+
+        for name, matrix in matrices.items():
+            setattr(self, name, Transform2D(matrix))
 
     def map_spectra_to_focal_plane(self, fov):
         """
@@ -219,57 +242,63 @@ class SpectralTrace:
 
         try:
             xilam = XiLamImage(fov, avg_dlam_per_pix)
-            self.xilam = xilam    # ..todo: remove
         except ValueError:
             print(" ---> ", self.meta['trace_id'], "gave ValueError")
 
         npix_xi, npix_lam = xilam.npix_xi, xilam.npix_lam
         xilam_wcs = xilam.wcs
 
-        # focal-plane coordinate images
-        ximg_fpa, yimg_fpa = np.meshgrid(np.linspace(xmin_mm, xmax_mm,
-                                                     sub_naxis1,
-                                                     dtype=np.float32),
-                                         np.linspace(ymin_mm, ymax_mm,
-                                                     sub_naxis2,
-                                                     dtype=np.float32))
-
-        # Image mapping (xi, lambda) on the focal plane
-        xi_fpa = self.xy2xi(ximg_fpa, yimg_fpa).astype(np.float32)
-        lam_fpa = self.xy2lam(ximg_fpa, yimg_fpa).astype(np.float32)
-
-        # mask everything outside the wavelength range
-        mask = (xi_fpa >= xi_min) & (xi_fpa <= xi_max)
-        xi_fpa *= mask
-        lam_fpa *= mask
-
-        # mask everything outside the wavelength range
-        # mask = (lam_fpa >= wave_min) & (lam_fpa <= wave_max)
-        # xi_fpa *= mask
-        # lam_fpa *= mask
-
-        # Convert to pixel images
-        # These are the pixel coordinates in the image corresponding to
-        # xi, lambda
-        # It is much quicker to do the linear transformation by hand
-        # than to use the astropy.wcs functions for conversion.
-        i_img = ((lam_fpa - xilam_wcs.wcs.crval[0])
-                 / xilam_wcs.wcs.cdelt[0]).astype(int)
-        j_img = ((xi_fpa - xilam_wcs.wcs.crval[1])
-                 / xilam_wcs.wcs.cdelt[1]).astype(int)
-
-        # truncate images to remove pixel coordinates outside the image
-        ijmask = ((i_img >= 0) * (i_img < npix_lam)
-                  * (j_img >= 0) * (j_img < npix_xi))
+        def _focal_plane_maps():
+            # focal-plane coordinate images
+            # The pixel grid is separable, so the transforms are evaluated on
+            # the grid of the x and y axes of the sub-window
+            x_fpa = np.linspace(xmin_mm, xmax_mm, sub_naxis1, dtype=np.float32)
+            y_fpa = np.linspace(ymin_mm, ymax_mm, sub_naxis2, dtype=np.float32)
+
+            # Image mapping (xi, lambda) on the focal plane
+            xi_fpa = self.xy2xi(x_fpa, y_fpa, grid=True, dtype=np.float32)
+            lam_fpa = self.xy2lam(x_fpa, y_fpa, grid=True, dtype=np.float32)
+
+            # mask everything outside the wavelength range
+            mask = (xi_fpa >= xi_min) & (xi_fpa <= xi_max)
+            xi_fpa *= mask
+            lam_fpa *= mask
+
+            # Convert to pixel images
+            # These are the pixel coordinates in the image corresponding to
+            # xi, lambda
+            # It is much quicker to do the linear transformation by hand
+            # than to use the astropy.wcs functions for conversion.
+            i_img = ((lam_fpa - xilam_wcs.wcs.crval[0])
+                     / xilam_wcs.wcs.cdelt[0]).astype(int)
+            j_img = ((xi_fpa - xilam_wcs.wcs.crval[1])
+                     / xilam_wcs.wcs.cdelt[1]).astype(int)
+
+            # truncate images to remove pixel coordinates outside the image
+            ijmask = ((i_img >= 0) * (i_img < npix_lam)
+                      * (j_img >= 0) * (j_img < npix_xi))
+
+            # wavelength step per detector pixel
+            dlam_by_dx, dlam_by_dy = self.xy2lam.gradient()
+            dlam_per_pix = pixsize * np.sqrt(
+                dlam_by_dx(x_fpa, y_fpa, grid=True, dtype=np.float32)**2 +
+                dlam_by_dy(x_fpa, y_fpa, grid=True, dtype=np.float32)**2)
+
+            return xi_fpa, lam_fpa, ijmask, dlam_per_pix
+
+        # The maps only depend on the trace, the sub-window and the grid of
+        # the xi-lambda image, not on the source, so they are cached
+        window = (xmin_mm, xmax_mm, ymin_mm, ymax_mm, sub_naxis1, sub_naxis2,
+                  xi_min, xi_max, pixsize, *xilam_wcs.wcs.crval,
+                  *xilam_wcs.wcs.cdelt, npix_xi, npix_lam)
+        xi_fpa, lam_fpa, ijmask, dlam_per_pix = self.map_cache.get(
+            (self.xy2xi, self.xy2lam), window, _focal_plane_maps)
 
         # do the actual interpolation
         # image is in [ph/s/um/arcsec]
         image = xilam.interp(xi_fpa, lam_fpa, grid=False) * ijmask
 
         # Scale to ph / s / pixel
-        dlam_by_dx, dlam_by_dy = self.xy2lam.gradient()
-        dlam_per_pix = pixsize * np.sqrt(dlam_by_dx(ximg_fpa, yimg_fpa)**2 +
-                                         dlam_by_dy(ximg_fpa, yimg_fpa)**2)
         image *= pixscale * dlam_per_pix        # [arcsec/pix] * [um/pix]
 
         # img_header = sub_wcs.to_header()
@@ -423,6 +452,79 @@ class SpectralTrace:
         return msg
 
 
+class TraceMapCache:
+    """
+    A memory-bounded LRU cache for the focal-plane maps of spectral traces
+
+    The maps of (xi, lambda) on a detector sub-window, the mask of valid
+    pixels and the wavelength step per pixel only depend on the transforms of
+    a trace and on the sub-window, not on the source. The transforms are
+    keyed by object identity. The cache holds a reference to them, so the
+    identity stays valid for the lifetime of the entry, and recomputed
+    transforms never hit stale maps. The same instance can be shared by all
+    traces of a SpectralTraceList (also across threads).
+
+    Parameters
+    ----------
+    max_size : float
+        [MB] Maximum memory held by the cached maps. 0 disables the cache
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups served from the cache, or computed afresh
+
+    """
+    def __init__(self, max_size=128):
+        self.max_bytes = max_size * 2**20
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, transforms, window, compute):
+        """
+        Returns the maps for ``transforms`` on ``window``
+
+        ``compute()`` is only called if the maps are not in the cache. It
+        must return a tuple of arrays, which are made read-only.
+        """
+        key = (tuple(id(tf) for tf in transforms),
+               tuple(float(val) for val in window))
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key][1]
+            self.misses += 1
+
+        maps = tuple(np.asarray(arr) for arr in compute())
+        for arr in maps:
+            arr.setflags(write=False)
+        nbytes = sum(arr.nbytes for arr in maps)
+        if nbytes > self.max_bytes:
+            return maps
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = (transforms, maps, nbytes)
+                self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, _, old_nbytes) = self._cache.popitem(last=False)
+                self._nbytes -= old_nbytes
+
+        return maps
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+
 class XiLamImage():
     """
     Class to compute a rectified 2D spectrum
@@ -458,18 +560,25 @@ class XiLamImage():
         self.image = np.zeros((n_xi, n_lam), dtype=np.float32)
         self.lam = cube_lam
 
-        for i, eta in enumerate(cube_eta):
-            #if abs(eta) > fov.slit_width / 2:   # ..todo: needed?
-            #    continue
-
-            lam0 = self.lam + dlam_per_pix * eta / d_eta
-            # lam0 is the target wavelength. We need to check that this
-            # overlaps with the wavelength range covered by the cube
-            if lam0.min() < cube_lam.max() and lam0.max() > cube_lam.min():
-                plane = fov.cube.data[:, i, :].T
-                plane_interp = RectBivariateSpline(cube_xi, cube_lam, plane,
-                                                   kx=1, ky=1)
-                self.image += plane_interp(cube_xi, lam0)
+        # lam0 is the target wavelength of each eta plane. Only planes that
+        # overlap with the wavelength range covered by the cube are added.
+        lam0 = self.lam[None, :] + dlam_per_pix * cube_eta[:, None] / d_eta
+        i_eta = np.where((lam0.min(axis=1) < cube_lam.max()) &
+                         (lam0.max(axis=1) > cube_lam.min()))[0]
+
+        # Linear interpolation along lambda of all eta planes at once, using
+        # precomputed indices and weights. Identical to RectBivariateSpline
+        # with kx=ky=1, which also holds the edge values beyond the cube.
+        # The planes are gathered in chunks to limit the memory use.
+        i_lam, w_lam = linear_interp_weights(cube_lam, lam0[i_eta])
+        image = np.zeros((n_lam, n_xi))
+        n_chunk = max(1, 2**24 // (n_lam * n_xi))
+        for k in range(0, len(i_eta), n_chunk):
+            rows = i_eta[k:k + n_chunk, None]
+            idx, wgt = i_lam[k:k + n_chunk], w_lam[k:k + n_chunk, :, None]
+            image += np.sum(fov.cube.data[idx, rows, :] * (1 - wgt) +
+                            fov.cube.data[idx + 1, rows, :] * wgt, axis=0)
+        self.image += image.T
 
         self.image *= d_eta     # ph/s/um/arcsec2 --> ph/s/um/arcsec
 
@@ -555,6 +664,7 @@ class Transform2D():
         self.pretransform_x = self._repackage(pretransform_x)
         self.pretransform_y = self._repackage(pretransform_y)
         self.posttransform = self._repackage(posttransform)
+        self._gradient = None
 
     def _repackage(self, trafo):
         """Make sure `trafo` is a tuple"""
@@ -563,7 +673,7 @@ class Transform2D():
         return trafo
 
 
-    def __call__(self, x, y, grid=False, **kwargs):
+    def __call__(self, x, y, grid=False, dtype=None, **kwargs):
         """
         Apply the polynomial transform
 
@@ -573,6 +683,10 @@ class Transform2D():
         the vectors of x and y define the components of a number of points (in
         this case, x and y must be of the same length).
 
+        The polynomial is evaluated with the Horner scheme. On a grid, the
+        polynomials in x are evaluated once per value of x, and then combined
+        with the powers of y in a single matrix product.
+
         Functions `pretransform_x`, `pretransform_y` and `posttransform`
         can be supplied to override the instance values.
 
@@ -582,6 +696,8 @@ class Transform2D():
             x and y values to transform
         grid : boolean
             If true, return result for all pairs of components in x and y.
+        dtype : np.dtype, optional
+            dtype of the result, e.g. np.float32 for large maps
 
         Return
         ------
@@ -609,18 +725,16 @@ class Transform2D():
         if self.pretransform_y is not None:
             y = self.pretransform_y[0](y, **self.pretransform_y[1])
 
-        xvec = power_vector(x.flatten(), self.nx - 1)
-        yvec = power_vector(y.flatten(), self.ny - 1)
-
-        temp = self.matrix @ xvec
+        # Polynomials in x for every power of y, shape (ny, len(x))
+        temp = horner(self.matrix.T[:, :, None], x.flatten())
 
         if grid:
-            result = yvec.T @ temp
+            result = power_vector(y.flatten(), self.ny - 1).T @ temp
         else:
-            # Compute the scalar product of each column in yvec with the
-            # corresponding column in temp. This gives the diagonal of the
-            # expression in the "grid" branch.
-            result = (yvec * temp).sum(axis=0)
+            # Combine the polynomials in x with the powers of y point by
+            # point. This gives the diagonal of the expression in the "grid"
+            # branch.
+            result = horner(temp, y.flatten())
             if orig_shape == () or orig_shape is None:
                 result = np.float32(result)
             else:
@@ -630,6 +744,9 @@ class Transform2D():
         if self.posttransform is not None:
             result = self.posttransform[0](result, **self.posttransform[1])
 
+        if dtype is not None:
+            result = np.asarray(result).astype(dtype, copy=False)
+
         return result
 
     @classmethod
@@ -643,14 +760,113 @@ class Transform2D():
         return Transform2D(fit2matrix(fit))
 
     def gradient(self):
-        """Compute the gradient of a 2d polynomial transformation"""
+        """
+        Compute the gradient of a 2d polynomial transformation
+
+        The derivative transforms are computed once and then reused, so the
+        matrix must not be changed in place afterwards.
+        """
+        if self._gradient is None:
+            mat = self.matrix
+
+            dmat_x = (mat * np.arange(self.nx))[:, 1:]
+            dmat_y = (mat.T * np.arange(self.ny)).T[1:, :]
+
+            self._gradient = (Transform2D(dmat_x), Transform2D(dmat_y))
+
+        return self._gradient
+
+
+def horner(coeffs, x):
+    """
+    Evaluate a polynomial in x with the Horner scheme
+
+    Parameters
+    ----------
+    coeffs : array
+        Shape (degree + 1, ...). ``coeffs[i]`` is the coefficient of ``x^i``.
+        The remaining axes must broadcast against x, so that several
+        polynomials, or one polynomial per value of x, can be evaluated at once
+    x : array
+
+    Returns
+    -------
+    values : array
+        ``sum_i coeffs[i] * x^i``
+
+    """
+    result = coeffs[-1] * np.ones_like(x)
+    for coeff in coeffs[-2::-1]:
+        result = result * x + coeff
+    return result
+
+
+def trace_fit_key(columns, degree=4):
+    """
+    Returns a hash of the trace table columns that the transforms are fit to
+
+    The hash also covers the degree of the fits and the version of the cache
+    format, so that changed fits never load stale matrices.
+    """
+    sha = hashlib.sha1(f"Transform2D.fit v1 degree={degree}".encode())
+    for col in columns:
+        arr = np.ascontiguousarray(getattr(col, "value", col), dtype=float)
+        sha.update(str(arr.shape).encode())
+        sha.update(arr.view(np.uint8))
+    return sha.hexdigest()
+
+
+def load_trace_fits(cache_path, key):
+    """
+    Returns the fitted matrices for ``key`` from the disk cache
+
+    Parameters
+    ----------
+    cache_path : str, None
+        Directory of the cache. If None, the cache is disabled
+    key : str
+        As returned by ``trace_fit_key``
+
+    Returns
+    -------
+    matrices : dict, None
+        ``{name: matrix}``, or None if the matrices are not in the cache
+
+    """
+    if cache_path is None:
+        return None
 
-        mat = self.matrix
+    filename = os.path.join(cache_path, f"trace_fit_{key}.npz")
+    if not os.path.exists(filename):
+        return None
 
-        dmat_x = (mat * np.arange(self.nx))[:, 1:]
-        dmat_y = (mat.T * np.arange(self.ny)).T[1:, :]
+    try:
+        with np.load(filename) as npz:
+            return {name: npz[name] for name in npz.files}
+    except (OSError, ValueError) as err:
+        logging.warning(f"Could not read trace fit cache {filename}: {err}")
+        return None
 
-        return Transform2D(dmat_x), Transform2D(dmat_y)
+
+def save_trace_fits(cache_path, key, matrices):
+    """
+    Saves the fitted matrices for ``key`` in the disk cache
+
+    The file is written to a temporary name first and then renamed, so that
+    processes starting at the same time never read half-written files.
+    """
+    if cache_path is None:
+        return
+
+    filename = os.path.join(cache_path, f"trace_fit_{key}.npz")
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(suffix=".npz", dir=cache_path)
+        with os.fdopen(fd, "wb") as tmp_file:
+            np.savez(tmp_file, **matrices)
+        os.replace(tmp_name, filename)
+    except OSError as err:
+        logging.warning(f"Could not write trace fit cache {filename}: {err}")
 
 
 def fit2matrix(fit):
@@ -743,6 +959,87 @@ def _xiy2xlam_fit(layout, params):
     return xiy2x, xiy2lam
 
 
+def linear_interp_weights(xp, x):
+    """
+    Returns the indices and weights for linear interpolation of x in xp
+
+    ``fp[..., i] * (1 - w) + fp[..., i + 1] * w`` interpolates ``fp`` at x.
+    Values of x outside of xp are given the edge values of fp, as is done by
+    ``np.interp`` and by scipy's splines with k=1.
+
+    Parameters
+    ----------
+    xp : array
+        Strictly increasing coordinates of the data points. At least 2 values
+    x : array
+        Coordinates to interpolate at. Can have any shape
+
+    Returns
+    -------
+    i : array of int
+        Same shape as x. The index of the data point to the left of x
+    w : array
+        Same shape as x. The weight of the data point to the right of x
+
+    """
+    xp = np.asarray(xp)
+    i = np.clip(np.searchsorted(xp, x, side="right") - 1, 0, len(xp) - 2)
+    w = np.clip((x - xp[i]) / (xp[i + 1] - xp[i]), 0, 1)
+    return i, w
+
+
+def bilinear_sampler(n_y, n_x, y, x):
+    """
+    Returns an operator that samples images at pixel coordinates (y, x)
+
+    The operator can be applied to any number of images of shape (n_y, n_x),
+    e.g. all the planes of a cube, with ``apply_bilinear_sampler``. The
+    result is identical to ``RectBivariateSpline(np.arange(n_y),
+    np.arange(n_x), image, kx=1, ky=1)(y, x, grid=False)``.
+
+    Parameters
+    ----------
+    n_y, n_x : int
+        Shape of the images to sample. Both must be at least 2
+    y, x : array
+        Pixel coordinates to sample at. Must have the same shape
+
+    Returns
+    -------
+    sampler : tuple
+        (iy, ix, wy, wx) : the indices of the lower left neighbour pixels and
+        the weights of the upper right neighbours
+
+    """
+    iy, wy = linear_interp_weights(np.arange(n_y), y)
+    ix, wx = linear_interp_weights(np.arange(n_x), x)
+    return iy, ix, wy, wx
+
+
+def apply_bilinear_sampler(data, sampler):
+    """
+    Samples the last two axes of ``data`` with a ``bilinear_sampler``
+
+    Parameters
+    ----------
+    data : array
+        Shape (..., n_y, n_x)
+    sampler : tuple
+        As returned by ``bilinear_sampler``
+
+    Returns
+    -------
+    samples : array
+        Shape ``(...) + y.shape``
+
+    """
+    iy, ix, wy, wx = sampler
+    return ((data[..., iy, ix] * (1 - wx) +
+             data[..., iy, ix + 1] * wx) * (1 - wy) +
+            (data[..., iy + 1, ix] * (1 - wx) +
+             data[..., iy + 1, ix + 1] * wx) * wy)
+
+
 # ..todo: Check whether the following functions are actually used
 def rolling_median(x, n):
     """ Calculates the rolling median of a sequence for +/- n entries """
@@ -323,11 +323,31 @@ def apply_throughput_to_cube(cube, thru):
     -------
     cube : ImageHDU, header unchanged, data multiplied with wavelength-dependent
          throughput
+
+    Notes
+    -----
+    Cubes left untouched by a lazy ``OpticalTrain.prepare_source`` keep their
+    data. The throughput is evaluated on their ``fov_waveset`` instead and
+    applied to each resampled slab by ``fov_utils.extract_cube_slab``.
+
+    The data of cubes resampled by ``OpticalTrain.prepare_source``
+    (``cube.owns_data``) are multiplied in place, so that large, memory-mapped
+    cubes are not loaded into memory.
     """
+    if getattr(cube, "fov_waveset", None) is not None:
+        thru_grid = thru(cube.fov_waveset.to(u.AA)).value
+        cube.fov_throughput = getattr(cube, "fov_throughput", 1) * thru_grid
+        return cube
+
     wcs = WCS(cube.header).spectral
     wave_cube = wcs.all_pix2world(np.arange(cube.data.shape[0]), 0)[0]
     wave_cube = (wave_cube * u.Unit(wcs.wcs.cunit[0])).to(u.AA)
-    cube.data *= thru(wave_cube).value[:, None, None]
+    thru_cube = thru(wave_cube).value[:, None, None]
+    if getattr(cube, "owns_data", False):
+        np.multiply(cube.data, thru_cube, out=cube.data, casting="unsafe")
+    else:
+        # not in place: the data may be shared with the user's Source object
+        cube.data = cube.data * thru_cube
     return cube
 
 def combine_two_spectra(spec_a, spec_b, action, wave_min, wave_max):
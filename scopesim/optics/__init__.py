@@ -13,4 +13,5 @@ from .radiometry import RadiometryTable
 from . import radiometry_utils
 
 from .fov import FieldOfView
-from .fov_manager import FOVManager
\ No newline at end of file
+from .fov_manager import FOVManager
+from .observation_plan import ObservationPlan
\ No newline at end of file
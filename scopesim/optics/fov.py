@@ -1,5 +1,4 @@
 """Defines FieldOfView class"""
-from copy import deepcopy
 
 import numpy as np
 from scipy.interpolate import interp1d
@@ -74,6 +73,12 @@ class FieldOfView(FieldOfViewBase):
         self.image_plane_id = 0
         self.fields = []
         self.spectra = {}
+        # shared between all FOVs of an observation by OpticalTrain.observe
+        self.spectrum_cache = fu.SpectrumCache(max_size=0)
+        # spatial indexes of the Source table fields, shared in the same way
+        self.table_indexes = None
+        # image fields resampled onto the FOV grid, also shared
+        self.image_cache = fu.ResampledImageCache(max_size=0)
 
         self.cube = None        # 3D array for IFU, long-lit, Slicer-MOS
         self.image = None       # 2D array for Imagers
@@ -104,14 +109,24 @@ class FieldOfView(FieldOfViewBase):
         if not isinstance(src, SourceBase):
             raise ValueError(f"source must be a Source object: {type(src)}")
 
-        fields_in_fov = [field for field in src.fields
-                         if fu.is_field_in_fov(self.header, field)]
+        volume = self.volume()
+
+        # With a shared spatial index, table fields are extracted with a range
+        # query instead of masking the full table for every FOV
+        fields_in_fov = []
+        for field in src.fields:
+            if isinstance(field, Table) and self.table_indexes is not None:
+                field = self.table_indexes.get(field).extract(volume)
+                if len(field) > 0:
+                    fields_in_fov += [field]
+            elif fu.is_field_in_fov(self.header, field):
+                if isinstance(field, Table):
+                    field = fu.extract_area_from_table(field, volume)
+                fields_in_fov += [field]
 
         spec_refs = []
-        volume = self.volume()
         for ifld, fld in enumerate(fields_in_fov):
             if isinstance(fld, Table):
-                fields_in_fov[ifld] = fu.extract_area_from_table(fld, volume)
                 spec_refs += list(np.unique(fields_in_fov[ifld] ["ref"]))
 
             elif isinstance(fld, fits.ImageHDU):
@@ -123,7 +138,8 @@ class FieldOfView(FieldOfViewBase):
                         spec_refs += [ref]
 
         waves = volume["waves"] * u.Unit(volume["wave_unit"])
-        spectra = {ref: fu.extract_range_from_spectrum(src.spectra[ref], waves)
+        spectra = {ref: self.spectrum_cache.extract_range(src.spectra[ref],
+                                                          waves)
                    for ref in np.unique(spec_refs)}
 
         self.fields = fields_in_fov
@@ -162,6 +178,22 @@ class FieldOfView(FieldOfViewBase):
             image = np.sum(self.hdu.data, axis=0)
             self.hdu.data = image
 
+    def clear(self):
+        """
+        Releases the data held by the FOV, keeping only headers and meta data
+
+        Afterwards the footprint of the FOV (``corners``, ``volume()``) is
+        still available, but ``extract_from`` and ``view`` need to be called
+        again to regain the data.
+
+        """
+        self.hdu = None
+        self.fields = []
+        self.spectra = {}
+        self.cube = None
+        self.image = None
+        self.spectrum = None
+
     def make_spectrum(self):
         """
         This is needed for when we do incoherent MOS instruments.
@@ -196,7 +228,8 @@ class FieldOfView(FieldOfViewBase):
         fov_waveset = self.waveset
         canvas_flux = np.zeros(len(fov_waveset))
 
-        specs = {ref: spec(fov_waveset) for ref, spec in self.spectra.items()}
+        specs = {ref: self.spectrum_cache.evaluate(spec, fov_waveset)
+                 for ref, spec in self.spectra.items()}
 
         for field in self.cube_fields:
             hdu_waveset = fu.get_cube_waveset(field.header, return_quantity=True)
@@ -211,8 +244,7 @@ class FieldOfView(FieldOfViewBase):
         for field in self.image_fields:
             ref = field.header["SPEC_REF"]
             weight = np.sum(field.data)
-            canvas_flux += self.spectra[ref](fov_waveset).value * weight
-
+            canvas_flux += specs[ref].value * weight
 
         for field in self.table_fields:
             refs = np.array(field["ref"])
@@ -220,14 +252,14 @@ class FieldOfView(FieldOfViewBase):
             weight_sums = {ref: np.sum(weights[refs == ref])
                            for ref in np.unique(refs)}
             for ref, weight in weight_sums.items():
-                canvas_flux += self.spectra[ref](fov_waveset).value * weight
+                canvas_flux += specs[ref].value * weight
 
         for field in self.background_fields:
             bg_solid_angle = u.Unit(field.header["SOLIDANG"]).to(u.arcsec**-2)
             area_factor = self.pixel_area * bg_solid_angle       # arcsec**2 * arcsec**-2
 
             ref = field.header["SPEC_REF"]
-            canvas_flux += self.spectra[ref](fov_waveset).value * area_factor
+            canvas_flux += specs[ref].value * area_factor
 
         spectrum = SourceSpectrum(Empirical1D, points=fov_waveset,
                                   lookup_table=canvas_flux)
@@ -274,20 +306,20 @@ class FieldOfView(FieldOfViewBase):
 
         """
         spline_order = utils.from_currsys("!SIM.computing.spline_order")
+        method = utils.from_currsys("!SIM.computing.resample_method")
 
         # 1. Make waveset and canvas image
         fov_waveset = np.unique(self.waveset)
-        bin_widths = np.diff(fov_waveset)       # u.um
-        bin_widths = 0.5 * (np.r_[0, bin_widths] + np.r_[bin_widths, 0])
         area = utils.from_currsys(self.meta["area"])    # u.m2
 
         # PHOTLAM * u.um * u.m2 --> ph / s
-        specs = {ref: spec(fov_waveset) for ref, spec in self.spectra.items()}
+        cache = self.spectrum_cache
         if use_photlam is False:
-            for key in specs:
-                specs[key] = (specs[key] * bin_widths * area).to(u.ph / u.s)
-
-        fluxes = {ref: np.sum(spec).value for ref, spec in specs.items()}
+            fluxes = {ref: cache.photon_flux(spec, fov_waveset, area)
+                      for ref, spec in self.spectra.items()}
+        else:
+            fluxes = {ref: np.sum(cache.evaluate(spec, fov_waveset)).value
+                      for ref, spec in self.spectra.items()}
         naxis1, naxis2 = self.header["NAXIS1"], self.header["NAXIS2"]
         canvas_image_hdu = fits.ImageHDU(data=np.zeros((naxis2, naxis1)),
                                          header=self.header)
@@ -311,18 +343,16 @@ class FieldOfView(FieldOfViewBase):
                 tmp_hdu,
                 canvas_image_hdu,
                 conserve_flux=True,
-                spline_order=spline_order)
+                spline_order=spline_order,
+                method=method)
 
         # 2. Find Image fields
         for field in self.image_fields:
-            image = deepcopy(field.data)
-            tmp_hdu = fits.ImageHDU(data=image, header=field.header)
-            tmp_hdu.data *= fluxes[field.header["SPEC_REF"]]  # ph / s
-            canvas_image_hdu = imp_utils.add_imagehdu_to_imagehdu(
-                tmp_hdu,
-                canvas_image_hdu,
-                conserve_flux=True,
-                spline_order=spline_order)
+            image = self.image_cache.resample(field, self.header,
+                                              spline_order=spline_order,
+                                              method=method)
+            flux = fluxes[field.header["SPEC_REF"]]  # ph / s
+            canvas_image_hdu.data += image * flux
 
         # 3. Find Table fields
         for field in self.table_fields:
@@ -330,24 +360,12 @@ class FieldOfView(FieldOfViewBase):
             xpix, ypix = imp_utils.val2pix(self.header,
                                            field["x"] / 3600,
                                            field["y"] / 3600)
-            if utils.from_currsys(self.meta["sub_pixel"]):
-                for i, row in enumerate(field):
-                    xs, ys, fracs = imp_utils.sub_pixel_fractions(xpix[i],
-                                                                  ypix[i])
-                    ref, weight = row["ref"], row["weight"]
-                    for x, y, f in zip(xs, ys, fracs):
-                        canvas_image_hdu.data[y, x] += fluxes[ref] * weight * f
-            else:
-                # Note: these had x/ypix+0.5 until a06ab75
-                x = np.array(xpix).astype(int)
-                y = np.array(ypix).astype(int)     # quickest way to round
-                f = np.array([fluxes[ref] for ref in field["ref"]])
-                weight = np.array(field["weight"])
-
-                # Mask out any stars that were pushed out of the fov by rounding
-                m = (x < canvas_image_hdu.data.shape[1]) * \
-                    (y < canvas_image_hdu.data.shape[0])
-                canvas_image_hdu.data[y[m], x[m]] += f[m] * weight[m]
+            # Note: the int-pixel case had x/ypix+0.5 until a06ab75
+            f = np.array([fluxes[ref] for ref in field["ref"]])
+            weight = np.array(field["weight"])
+            sub_pixel = utils.from_currsys(self.meta["sub_pixel"])
+            imp_utils.add_points_to_canvas(canvas_image_hdu.data, xpix, ypix,
+                                           f * weight, sub_pixel=sub_pixel)
 
         # 4. Find Background fields
         for field in self.background_fields:
@@ -420,6 +438,7 @@ class FieldOfView(FieldOfViewBase):
 
         """
         spline_order = utils.from_currsys("!SIM.computing.spline_order")
+        method = utils.from_currsys("!SIM.computing.resample_method")
 
 
         # 1. Make waveset and canvas cube (area, bin_width are applied at end)
@@ -440,7 +459,7 @@ class FieldOfView(FieldOfViewBase):
         #     wmin, wmax = wave_min.to(u.um).value, wave_max.to(u.um).value
         #     fov_waveset = np.logspace(wmin, wmax, wave_bin_n)
 
-        specs = {ref: spec(fov_waveset)                     # PHOTLAM = ph/s/cm2/AA
+        specs = {ref: self.spectrum_cache.evaluate(spec, fov_waveset)  # PHOTLAM
                  for ref, spec in self.spectra.items()}
 
         # make canvas cube based on waveset of largest cube and NAXIS1,2 from fov.header
@@ -457,12 +476,18 @@ class FieldOfView(FieldOfViewBase):
             field_waveset = fu.get_cube_waveset(field.header,
                                                 return_quantity=True)
 
-            # ..todo: Deal with this bounds_error in a more elegant way
-            field_interp = interp1d(field_waveset.to(u.um).value,
-                                    field.data, axis=0, kind="linear",
-                                    bounds_error=False, fill_value=0)
-
-            field_data = field_interp(fov_waveset.value)
+            field_waveset = field_waveset.to(u.um).value
+            atol = 1e-3 * (dwave * wave_unit).to(u.um).value
+            if len(field_waveset) == len(fov_waveset) and np.allclose(
+                    field_waveset, fov_waveset.value, rtol=0, atol=atol):
+                # e.g. slabs already resampled by fu.extract_cube_slab
+                field_data = field.data.astype(float)
+            else:
+                # ..todo: Deal with this bounds_error in a more elegant way
+                field_interp = interp1d(field_waveset, field.data, axis=0,
+                                        kind="linear", bounds_error=False,
+                                        fill_value=0)
+                field_data = field_interp(fov_waveset.value)
 
             # Pixel scale conversion
             field_pixarea = (field.header['CDELT1']
@@ -475,7 +500,8 @@ class FieldOfView(FieldOfViewBase):
             canvas_cube_hdu = imp_utils.add_imagehdu_to_imagehdu(
                 field_hdu,
                 canvas_cube_hdu,
-                spline_order=spline_order)
+                spline_order=spline_order,
+                method=method)
 
         # 3. Find Image fields
         for field in self.image_fields:
@@ -483,17 +509,12 @@ class FieldOfView(FieldOfViewBase):
             # Assumption is that ImageHDUs have units of PHOTLAM arcsec-2
             # ImageHDUs have photons/second/pixel.
             # ..todo: Add a catch to get ImageHDU with BUNITs
-            canvas_image_hdu = fits.ImageHDU(data=np.zeros((naxis2, naxis1)),
-                                             header=self.header)
-            pixarea = (field.header['CDELT1'] * u.Unit(field.header['CUNIT1']) *
-                       field.header['CDELT2'] * u.Unit(field.header['CUNIT2'])).to(u.arcsec**2)
-
-            field.data = field.data / self.pixel_area
-            canvas_image_hdu = imp_utils.add_imagehdu_to_imagehdu(field,
-                                                    canvas_image_hdu,
-                                                    spline_order=spline_order)
+            image = self.image_cache.resample(field, self.header,
+                                              spline_order=spline_order,
+                                              method=method)
+            image = image / self.pixel_area
             spec = specs[field.header["SPEC_REF"]]
-            field_cube = canvas_image_hdu.data[None, :, :] * spec[:, None, None]  # 2D * 1D -> 3D
+            field_cube = image[None, :, :] * spec[:, None, None]  # 2D * 1D -> 3D
             canvas_cube_hdu.data += field_cube.value
 
         # 4. Find Table fields
@@ -502,20 +523,20 @@ class FieldOfView(FieldOfViewBase):
             # Point sources are in PHOTLAM per pixel
             # Point sources need to be scaled up by inverse pixel_area
             pixel_area = self.pixel_area
-            for row in field:
-                xsky, ysky = row["x"], row["y"]
-                ref, weight = row["ref"], row["weight"]
-                # x, y are ALWAYS in arcsec - crval is in deg
-                xpix, ypix = imp_utils.val2pix(self.header, xsky / 3600, ysky / 3600)
-                if utils.from_currsys(self.meta["sub_pixel"]):
-                    xs, ys, fracs = imp_utils.sub_pixel_fractions(xpix, ypix)
-                    for i, j, k in zip(xs, ys, fracs):
-                        flux_vector = specs[ref].value * weight * k / pixel_area
-                        canvas_cube_hdu.data[:, j, i] +=  flux_vector
-                else:
-                    x, y = int(xpix), int(ypix)
-                    flux_vector = specs[ref].value * weight / pixel_area
-                    canvas_cube_hdu.data[:, y, x] += flux_vector
+            sub_pixel = utils.from_currsys(self.meta["sub_pixel"])
+            # x, y are ALWAYS in arcsec - crval is in deg
+            xpix, ypix = imp_utils.val2pix(self.header,
+                                           np.array(field["x"]) / 3600,
+                                           np.array(field["y"]) / 3600)
+            refs = np.array(field["ref"])
+            weights = np.array(field["weight"]) / pixel_area
+            for ref in np.unique(refs):
+                mask = refs == ref
+                imp_utils.add_points_to_canvas(canvas_cube_hdu.data,
+                                               xpix[mask], ypix[mask],
+                                               weights[mask],
+                                               sub_pixel=sub_pixel,
+                                               spectrum=specs[ref].value)
 
         # 5. Add Background fields
         for field in self.background_fields:
@@ -51,7 +51,7 @@ from . import fov_manager_utils as fmu
 from . import image_plane_utils as ipu
 from ..effects import DetectorList
 from ..effects import effects_utils as eu
-from ..utils import from_currsys
+from ..utils import from_currsys, quantify
 
 from .fov import FieldOfView
 from ..base_classes import FOVSetupBase
@@ -83,7 +83,9 @@ class FOVManager:
                      "sub_pixel": "!SIM.sub_pixel.flag",
                      "sub_pixel_fraction": "!SIM.sub_pixel.fraction",
                      "preload_fovs": "!SIM.computing.preload_field_of_views",
+                     "stream_fovs": "!SIM.computing.stream_field_of_views",
                      "decouple_sky_det_hdrs": "!INST.decouple_detector_from_sky_headers",
+                     "detector_margin": "!SIM.computing.fov_detector_margin",
                      "aperture_id": 0}
         self.meta.update(kwargs)
 
@@ -91,10 +93,12 @@ class FOVManager:
                                "wave_max": self.meta["wave_max"]})
         fvl_meta = ["area", "pixel_scale", "aperture_id"]
         params["meta"] = from_currsys({key: self.meta[key] for key in fvl_meta})
-        self.volumes_list = FovVolumeList(initial_volume=params)
+        self._initial_volume = params
+        self.volumes_list = FovVolumeList(initial_volume=deepcopy(params))
 
         self.effects = effects
         self._fovs_list = []
+        self.n_pruned_fovs = 0
         self.is_spectroscope = eu.is_spectroscope(effects)
 
         if from_currsys(self.meta["preload_fovs"]) is True:
@@ -109,37 +113,33 @@ class FOVManager:
         fovs : list of FieldOfView objects
 
         """
+        return list(self.generate_fovs())
 
-        # Ask all the effects to alter the volume_
-        params = {"pixel_scale": self.meta["pixel_scale"]}
+    def generate_fovs(self):
+        """
+        Lazily generates the FieldOfViews objects based self.effects
 
-        for effect in self.effects:
-            self.volumes_list = effect.apply_to(self.volumes_list, **params)
+        The FOV volumes are set up when the first FOV is requested. Each
+        FieldOfView object is only created when it is needed.
+
+        If ``!SIM.computing.fov_detector_margin`` is set, volumes farther than
+        this margin [arcsec] from all detectors are skipped. The number of
+        skipped volumes is stored in ``n_pruned_fovs`` as soon as the first
+        FOV has been requested.
+
+        Yields
+        ------
+        fov : FieldOfView
+
+        """
+        volumes = self._make_volumes()
 
-        # ..todo: add catch to split volumes larger than chunk_size
         pixel_scale = from_currsys(self.meta["pixel_scale"])
         plate_scale = from_currsys(self.meta["plate_scale"])
         pixel_size = pixel_scale / plate_scale
         plate_scale_deg = plate_scale / 3600.  # ["/mm] / 3600 = [deg/mm]
 
-        chunk_size = from_currsys(self.meta["chunk_size"])
-        max_seg_size = from_currsys(self.meta["max_segment_size"])
-
-        split_xs = []
-        split_ys = []
-        for vol in self.volumes_list:
-            vol_pix_area = (vol["x_max"] - vol["x_min"]) * \
-                           (vol["y_max"] - vol["y_min"]) / pixel_scale**2
-            if vol_pix_area > max_seg_size:
-                step = chunk_size * pixel_scale
-                split_xs += list(np.arange(vol["x_min"], vol["x_max"], step))
-                split_ys += list(np.arange(vol["y_min"], vol["y_max"], step))
-
-        self.volumes_list.split(axis=["x", "y"], value=(split_xs, split_ys))
-
-        fovs = []
-
-        for vol in self.volumes_list:
+        for vol in volumes:
             xs_min, xs_max = vol["x_min"] / 3600., vol["x_max"] / 3600.
             ys_min, ys_max = vol["y_min"] / 3600., vol["y_max"] / 3600.
             waverange = (vol["wave_min"], vol["wave_max"])
@@ -160,10 +160,101 @@ class FOVManager:
                 det_eff = eu.get_all_effects(self.effects, DetectorList)[0]
                 dethdr = det_eff.image_plane_header
 
-            fovs += [FieldOfView(skyhdr, waverange, detector_header=dethdr,
-                                 **vol["meta"])]
+            yield FieldOfView(skyhdr, waverange, detector_header=dethdr,
+                              **vol["meta"])
 
-        return fovs
+    @property
+    def waveranges(self):
+        """
+        The (wave_min, wave_max) of all FOVs, without creating the FOVs
+
+        Returns
+        -------
+        waveranges : list of tuples of Quantity
+            [um]
+
+        """
+        return [(quantify(vol["wave_min"], u.um),
+                 quantify(vol["wave_max"], u.um))
+                for vol in self._make_volumes()]
+
+    def _make_volumes(self):
+        """
+        Sets up ``volumes_list`` and returns the volumes which become FOVs
+
+        ``n_pruned_fovs`` is set to the number of volumes which are skipped
+        because they lie too far from all detectors.
+
+        """
+        # Start from the initial volume, so that each call gives the same
+        # FOVs. Ask all the effects to alter the volume_
+        self.volumes_list = FovVolumeList(
+            initial_volume=deepcopy(self._initial_volume))
+        params = {"pixel_scale": self.meta["pixel_scale"]}
+
+        for effect in self.effects:
+            self.volumes_list = effect.apply_to(self.volumes_list, **params)
+
+        # ..todo: add catch to split volumes larger than chunk_size
+        pixel_scale = from_currsys(self.meta["pixel_scale"])
+        chunk_size = from_currsys(self.meta["chunk_size"])
+        max_seg_size = from_currsys(self.meta["max_segment_size"])
+
+        split_xs = []
+        split_ys = []
+        for vol in self.volumes_list:
+            vol_pix_area = (vol["x_max"] - vol["x_min"]) * \
+                           (vol["y_max"] - vol["y_min"]) / pixel_scale**2
+            if vol_pix_area > max_seg_size:
+                step = chunk_size * pixel_scale
+                split_xs += list(np.arange(vol["x_min"], vol["x_max"], step))
+                split_ys += list(np.arange(vol["y_min"], vol["y_max"], step))
+
+        self.volumes_list.split(axis=["x", "y"], value=(split_xs, split_ys))
+
+        # FOVs that lie too far from all detectors to add any flux to them
+        # are skipped. The margin must allow for the PSF wings and any shifts
+        # of the FOVs, e.g. by atmospheric dispersion. Pruning is off if the
+        # margin is None
+        det_boxes = self._detector_footprints()
+        margin = from_currsys(self.meta["detector_margin"])
+        volumes = [vol for vol in self.volumes_list
+                   if det_boxes is None or margin is None or any(
+                       vol["x_min"] - margin < x_max and
+                       vol["x_max"] + margin > x_min and
+                       vol["y_min"] - margin < y_max and
+                       vol["y_max"] + margin > y_min
+                       for x_min, x_max, y_min, y_max in det_boxes)]
+        self.n_pruned_fovs = len(self.volumes_list) - len(volumes)
+
+        return volumes
+
+    def _detector_footprints(self):
+        """
+        Returns the on-sky boxes [arcsec] of all active detectors
+
+        Returns None if the FOVs are not tied to the detector plane, i.e. for
+        spectroscopy, for decoupled sky and detector headers, or if there is
+        no DetectorList.
+
+        """
+        det_effs = eu.get_all_effects(self.effects, DetectorList)
+        if len(det_effs) == 0 or self.is_spectroscope or \
+                from_currsys(self.meta["decouple_sky_det_hdrs"]) is True:
+            return None
+
+        # Same conversion to the sky as in DetectorList.apply_to, which set
+        # the limits of the volumes
+        pixel_scale = from_currsys(self.meta["pixel_scale"])   # ["]
+        boxes = []
+        for det_eff in det_effs:
+            scale = pixel_scale / det_eff.image_plane_header["CDELT1D"]
+            for hdr in det_eff.detector_headers():
+                x_mm, y_mm = ipu.calc_footprint(hdr, "D")
+                boxes += [(min(x_mm) * scale, max(x_mm) * scale,
+                           min(y_mm) * scale, max(y_mm) * scale)]
+
+        return boxes
 
     @property
     def fovs(self):
@@ -171,6 +262,20 @@ class FOVManager:
             self._fovs_list = self.generate_fovs_list()
         return self._fovs_list
 
+    def iter_fovs(self):
+        """
+        Returns an iterator over the FieldOfView objects
+
+        If ``!SIM.computing.stream_field_of_views`` is True (and the FOVs are
+        not preloaded), the FOVs are generated lazily, one at a time, instead
+        of building the full list up front.
+
+        """
+        if from_currsys(self.meta["stream_fovs"]) is True and \
+                from_currsys(self.meta["preload_fovs"]) is False:
+            return self.generate_fovs()
+        return iter(self.fovs)
+
     @property
     def fov_footprints(self, which="both"):
         return None
@@ -1,7 +1,11 @@
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from copy import deepcopy
 
 import numpy as np
+from scipy.interpolate import interp1d
 from astropy import units as u
 from astropy.io import fits
 from astropy.table import Table, Column
@@ -267,6 +271,99 @@ def extract_area_from_table(table, fov_volume):
     return table_new
 
 
+class TableIndex:
+    """
+    A spatial index of the x, y columns of a Source table field
+
+    The rows are grouped into bands of y, and sorted by x within each band.
+    A box query only looks at the bands that overlap with the box and finds
+    the range of x in each band by bisection. This makes extracting the rows
+    of one FOV roughly O(rows in the FOV), instead of O(rows in the table).
+
+    Parameters
+    ----------
+    table : astropy.Table
+        Must have the columns "x" and "y" with units
+
+    """
+    def __init__(self, table):
+        self.table = table
+        self.x_unit = table["x"].unit
+        self.y_unit = table["y"].unit
+        x = np.asarray(table["x"].data, dtype=float)
+        y = np.asarray(table["y"].data, dtype=float)
+
+        n_bands = max(1, int(np.sqrt(len(table))))
+        y_lim = (np.min(y), np.max(y)) if len(table) > 0 else (0, 0)
+        self.band_edges = np.linspace(y_lim[0], y_lim[1], n_bands + 1)
+        bands = self._band(y)
+
+        self.order = np.lexsort((x, bands))
+        self.x = x[self.order]
+        self.y = y[self.order]
+        self.band_starts = np.searchsorted(bands[self.order],
+                                           np.arange(n_bands + 1))
+
+    def _band(self, y):
+        n_bands = len(self.band_edges) - 1
+        return np.clip(np.searchsorted(self.band_edges, y, side="right") - 1,
+                       0, n_bands - 1)
+
+    def query(self, xs, ys):
+        """
+        Returns the indices of the rows with xs[0] <= x < xs[1] and
+        ys[0] <= y < ys[1], in table order. Limits are in the table units
+        """
+        rows = []
+        for band in range(self._band(ys[0]), self._band(ys[1]) + 1):
+            i0, i1 = self.band_starts[band], self.band_starts[band + 1]
+            j0, j1 = i0 + np.searchsorted(self.x[i0:i1], xs, side="left")
+            rows += [np.arange(j0, j1)]
+        rows = np.concatenate(rows)
+        rows = rows[(self.y[rows] >= ys[0]) * (self.y[rows] < ys[1])]
+
+        return np.sort(self.order[rows])
+
+    def extract(self, fov_volume):
+        """Same as ``extract_area_from_table(self.table, fov_volume)``"""
+        fov_unit = u.Unit(fov_volume["xy_unit"])
+        fov_xs = (fov_volume["xs"] * fov_unit).to(self.x_unit).value
+        fov_ys = (fov_volume["ys"] * fov_unit).to(self.y_unit).value
+
+        return self.table[self.query(fov_xs, fov_ys)]
+
+
+class TableIndexCache:
+    """
+    Holds one ``TableIndex`` per Source table field during one observation
+
+    Tables are keyed by object identity. The cache holds a reference to each
+    table, so the identity stays valid. The same instance can be shared by all
+    FieldOfView objects (also across threads), so that each index is only
+    built once.
+
+    """
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, table):
+        """Returns the ``TableIndex`` of ``table``, building it if needed"""
+        with self._lock:
+            index = self._indexes.get(id(table))
+            if index is None:
+                index = TableIndex(table)
+                self._indexes[id(table)] = index
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def __len__(self):
+        return len(self._indexes)
+
+
 def extract_area_from_imagehdu(imagehdu, fov_volume):
     """
     Extracts the part of a ImageHDU that fits inside the fov_volume
@@ -304,7 +401,15 @@ def extract_area_from_imagehdu(imagehdu, fov_volume):
     new_hdr = imp_utils.header_from_list_of_xy([x0s, x1s], [y0s, y1s],
                                                pixel_scale=hdr["CDELT1"])
 
-    if hdr["NAXIS"] == 3:
+    if hdr["NAXIS"] == 3 and getattr(imagehdu, "unit_scale", None) is not None:
+        # cube left untouched by a lazy OpticalTrain.prepare_source
+        data, wave_hdr = extract_cube_slab(imagehdu, fov_volume["waves"],
+                                           (y0p, y1p, x0p, x1p))
+        if data is None:
+            return None
+        new_hdr.update(wave_hdr)
+
+    elif hdr["NAXIS"] == 3:
 
         # Look 0.5*wdel past the fov edges in each direction to catch any
         # slices where the middle wavelength value doesn't fall inside the
@@ -321,18 +426,16 @@ def extract_area_from_imagehdu(imagehdu, fov_volume):
         wdel = hdr["CDELT3"]
         wunit = u.Unit(hdr.get("CUNIT3", "AA"))
         fov_waves = utils.quantify(fov_volume["waves"], u.um).to(wunit).value
-        mask = ((hdu_waves > fov_waves[0] - 0.5 * wdel) *
-                (hdu_waves <= fov_waves[1] + 0.5 * wdel))  # need to go [+/-] half a bin
+        edges = cube_edge_slices(hdu_waves, wdel, fov_waves)
 
         # OC [2021-12-14] if fov range is not covered by the source return nothing
-        if not np.any(mask):
+        if edges is None:
             print("FOV {} um - {} um: not covered by Source".format(fov_waves[0], fov_waves[1]))
             return None
 
-        i0p, i1p = np.where(mask)[0][0], np.where(mask)[0][-1]
-        f0 = (abs(hdu_waves[i0p] - fov_waves[0] + 0.5 * wdel) % wdel) / wdel    # blue edge
-        f1 = (abs(hdu_waves[i1p] - fov_waves[1] - 0.5 * wdel) % wdel) / wdel    # red edge
-        data = imagehdu.data[i0p:i1p+1, y0p:y1p, x0p:x1p]
+        i0p, i1p, f0, f1 = edges
+        # copy, so that scaling the edge slices doesn't alter the source cube
+        data = imagehdu.data[i0p:i1p+1, y0p:y1p, x0p:x1p].copy()
         data[0, :, :] *= f0
         if i1p > i0p:
             data[-1, :, :] *= f1
@@ -363,6 +466,119 @@ def extract_area_from_imagehdu(imagehdu, fov_volume):
     return new_imagehdu
 
 
+def cube_edge_slices(hdu_waves, wdel, fov_waves):
+    """
+    Returns the cube slices covering a FOV waverange and their edge weights
+
+    See ``extract_area_from_imagehdu`` for how the edge weights are defined.
+
+    Parameters
+    ----------
+    hdu_waves : np.ndarray
+        Wavelengths of the cube slices
+    wdel : float
+        Wavelength step of the cube, in the same unit as hdu_waves
+    fov_waves : list of float
+        The FOV wavelength edges, in the same unit as hdu_waves
+
+    Returns
+    -------
+    i0p, i1p, f0, f1 : int, int, float, float, None
+        The first and last slice, and the scaling factors for them. None if
+        the cube does not cover the FOV waverange
+
+    """
+    mask = ((hdu_waves > fov_waves[0] - 0.5 * wdel) *
+            (hdu_waves <= fov_waves[1] + 0.5 * wdel))  # need to go [+/-] half a bin
+    if not np.any(mask):
+        return None
+
+    i0p, i1p = np.where(mask)[0][0], np.where(mask)[0][-1]
+    f0 = (abs(hdu_waves[i0p] - fov_waves[0] + 0.5 * wdel) % wdel) / wdel    # blue edge
+    f1 = (abs(hdu_waves[i1p] - fov_waves[1] - 0.5 * wdel) % wdel) / wdel    # red edge
+
+    return i0p, i1p, f0, f1
+
+
+def extract_cube_slab(imagehdu, waverange, window):
+    """
+    Resamples a spatial window of an unprepared cube for one FOV
+
+    The result is identical to extracting the window from the cube that a
+    non-lazy ``OpticalTrain.prepare_source`` would make: The cube is
+    interpolated onto the FOV waveset of the whole observation
+    (``imagehdu.fov_waveset``), but only at the wavelengths that cover
+    ``waverange``. Only the slices bracketing these are read from the cube
+    and converted to PHOTLAM arcsec-2 with ``imagehdu.unit_scale``. The edge
+    slices are scaled as in ``extract_area_from_imagehdu``.
+
+    Parameters
+    ----------
+    imagehdu : fits.ImageHDU
+        Cube with the attributes ``wave`` [Quantity] and ``unit_scale``
+        [PHOTLAM arcsec-2 per BUNIT] for each slice, plus ``fov_waveset``
+        [Quantity] and ``fov_wave_hdr`` [dict], the waveset and spectral WCS
+        of the resampled cube. An optional ``fov_throughput`` on this waveset
+        is applied to the slab
+    waverange : list of float
+        [um] The FOV wavelength edges
+    window : tuple of int
+        (y0, y1, x0, x1) The spatial pixel window to extract
+
+    Returns
+    -------
+    data : np.ndarray, None
+        None if the cube does not cover the waverange
+    wave_hdr : dict
+        Spectral WCS keywords for data
+
+    """
+    grid_hdr = {"NAXIS3": len(imagehdu.fov_waveset)}
+    grid_hdr.update(imagehdu.fov_wave_hdr)
+    grid_waves = get_cube_waveset(grid_hdr)
+    wdel = grid_hdr["CDELT3"]
+    wunit = u.Unit(grid_hdr["CUNIT3"])
+    fov_waves = utils.quantify(waverange, u.um).to(wunit).value
+    edges = cube_edge_slices(grid_waves, wdel, fov_waves)
+    if edges is None:
+        logging.info("FOV %s um - %s um: not covered by Source", *waverange)
+        return None, {}
+
+    i0p, i1p, f0, f1 = edges
+    new_waves = imagehdu.fov_waveset[i0p:i1p + 1].to(u.um).value
+
+    # the cube slices bracketing the new wavelengths
+    hdu_waves = imagehdu.wave.to(u.um).value
+    n_hdu = len(hdu_waves)
+    i0 = np.searchsorted(hdu_waves, new_waves[0], side="right") - 1
+    i0 = max(min(i0, n_hdu - 2), 0)           # interp1d needs two slices
+    i1 = min(max(np.searchsorted(hdu_waves, new_waves[-1]) + 1, i0 + 2),
+             n_hdu)
+    y0, y1, x0, x1 = window
+    slab = imagehdu.data[i0:i1, y0:y1, x0:x1].astype(np.float32) * \
+        imagehdu.unit_scale[i0:i1, None, None]
+    slab_interp = interp1d(hdu_waves[i0:i1], slab, axis=0, kind="linear",
+                           bounds_error=False, fill_value=0)
+    data = slab_interp(new_waves).astype(np.float32)
+    fov_throughput = getattr(imagehdu, "fov_throughput", None)
+    if fov_throughput is not None:
+        data = data * fov_throughput[i0p:i1p + 1, None, None]
+    data[0, :, :] *= f0
+    if i1p > i0p:
+        data[-1, :, :] *= f1
+
+    wave_hdr = {"NAXIS": 3,
+                "NAXIS3": data.shape[0],
+                "CRVAL3": grid_waves[i0p],
+                "CRPIX3": 0,
+                "CDELT3": wdel,
+                "CUNIT3": grid_hdr["CUNIT3"],
+                "CTYPE3": grid_hdr["CTYPE3"],
+                "BUNIT": imagehdu.header["BUNIT"]}
+
+    return data, wave_hdr
+
+
 def get_cube_waveset(hdr, return_quantity=False):
     wval, wdel, wpix, wlen, = [hdr[kw] for kw in ["CRVAL3", "CDELT3",
                                                   "CRPIX3", "NAXIS3"]]
@@ -410,6 +626,193 @@ def extract_range_from_spectrum(spectrum, waverange):
     return new_spectrum
 
 
+class SpectrumCache:
+    """
+    A memory-bounded LRU cache for spectra evaluated during one observation
+
+    Spectra are keyed by object identity. The cache holds a reference to each
+    spectrum it has seen, so the identity stays valid for the lifetime of the
+    entry. Wavesets and wave ranges are keyed by value. The same instance can
+    be shared by all FieldOfView objects (also across threads), so that a
+    spectrum only needs to be evaluated once for each unique waveset.
+
+    Parameters
+    ----------
+    max_size : float
+        [MB] Maximum memory held by the cached arrays. 0 disables the cache
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups served from the cache, or computed afresh
+
+    """
+    def __init__(self, max_size=256):
+        self.max_bytes = max_size * 2**20
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def evaluate(self, spectrum, waveset):
+        """Returns ``spectrum(waveset)``"""
+        key = ("evaluate", id(spectrum), _array_key(waveset))
+        return self._lookup(key, spectrum, lambda: spectrum(waveset))
+
+    def photon_flux(self, spectrum, waveset, area):
+        """
+        Returns the flux [ph s-1] of spectrum integrated over the waveset bins
+
+        The bin widths are centred on the waveset values. ``area`` is the
+        collecting area of the telescope.
+        """
+        def _photon_flux():
+            bin_widths = np.diff(waveset)
+            bin_widths = 0.5 * (np.r_[0, bin_widths] + np.r_[bin_widths, 0])
+            flux = self.evaluate(spectrum, waveset) * bin_widths * area
+            return np.sum(flux.to(u.ph / u.s)).value
+
+        key = ("photon_flux", id(spectrum), _array_key(waveset),
+               _array_key(area))
+        return self._lookup(key, spectrum, _photon_flux)
+
+    def extract_range(self, spectrum, waverange):
+        """Returns ``extract_range_from_spectrum(spectrum, waverange)``"""
+        key = ("extract_range", id(spectrum), _array_key(waverange))
+        return self._lookup(key, spectrum, lambda: extract_range_from_spectrum(
+            spectrum, waverange))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _lookup(self, key, spectrum, compute):
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key][1]
+            self.misses += 1
+
+        value = compute()
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = (spectrum, value, nbytes)
+                self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, _, old_nbytes) = self._cache.popitem(last=False)
+                self._nbytes -= old_nbytes
+
+        return value
+
+
+class ResampledImageCache:
+    """
+    A memory-bounded LRU cache for image fields resampled onto a FOV grid
+
+    FOVs which only differ in wavelength cut the same window out of a Source
+    image field, and resample it onto the same pixel grid. With a shared
+    cache, this is only done once. The field images are resampled without
+    their flux scaling, which is linear and applied afterwards.
+
+    Field images are keyed by the memory location, shape and strides of
+    their data (the cut-outs are views of the Source field), together with
+    the WCS of the field and of the FOV. The cache holds a reference to the
+    data of each field, so that the memory location stays valid. The same
+    instance can be shared by all FieldOfView objects (also across threads).
+
+    Parameters
+    ----------
+    max_size : float
+        [MB] Maximum memory held by the cached images. 0 disables the cache
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups served from the cache, or computed afresh
+
+    """
+    def __init__(self, max_size=256):
+        self.max_bytes = max_size * 2**20
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resample(self, field, canvas_header, spline_order=1, wcs_suffix="",
+                 method="spline"):
+        """
+        Returns the 2D ``field`` image resampled onto the ``canvas_header`` grid
+
+        The returned array is read-only, as it may be shared between FOVs.
+        """
+        data = field.data
+        key = (data.__array_interface__["data"][0], data.shape, data.strides,
+               data.dtype.str, imp_utils.wcs_key(field.header, wcs_suffix),
+               imp_utils.wcs_key(canvas_header, wcs_suffix), spline_order,
+               method)
+
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key][1]
+            self.misses += 1
+
+        canvas_hdu = fits.ImageHDU(
+            data=np.zeros((canvas_header["NAXIS2"], canvas_header["NAXIS1"])),
+            header=canvas_header)
+        field_hdu = fits.ImageHDU(data=data, header=field.header)
+        image = imp_utils.add_imagehdu_to_imagehdu(field_hdu, canvas_hdu,
+                                                   spline_order, wcs_suffix,
+                                                   method=method).data
+        image.flags.writeable = False
+        if image.nbytes > self.max_bytes:
+            return image
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = (data, image)
+                self._nbytes += image.nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, old_image) = self._cache.popitem(last=False)
+                self._nbytes -= old_image.nbytes
+
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+
+def _array_key(arr):
+    """Returns a hashable key for the values (and unit) of an array"""
+    unit = str(getattr(arr, "unit", ""))
+    arr = np.ascontiguousarray(getattr(arr, "value", arr), dtype=float)
+    return arr.shape, unit, hashlib.sha1(arr.view(np.uint8)).hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, SourceSpectrum):
+        waveset = value.waveset
+        return 2 * waveset.nbytes if waveset is not None else 8
+    return getattr(value, "nbytes", 8)
+
+
 def make_cube_from_table(table, spectra, waveset, fov_header, sub_pixel=False):
     """
 
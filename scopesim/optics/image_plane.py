@@ -58,7 +58,8 @@ class ImagePlane(ImagePlaneBase):
         image = np.zeros((header["NAXIS2"]+1, header["NAXIS1"]+1))
         self.hdu = fits.ImageHDU(data=image, header=header)
 
-    def add(self, hdus_or_tables, sub_pixel=None, spline_order=None, wcs_suffix=""):
+    def add(self, hdus_or_tables, sub_pixel=None, spline_order=None,
+            wcs_suffix="", method=None):
         """
         Add a projection of an image or table files to the canvas
 
@@ -97,15 +98,23 @@ class ImagePlane(ImagePlaneBase):
         wcs_suffix : str, optional
             Default "". For sky coords - "" or "S", Detector coords - "D"
 
+        method : str, optional
+            How images are resampled onto the canvas, "spline" or "exact".
+            See ``add_imagehdu_to_imagehdu``. Default is
+            "!SIM.computing.resample_method"
+
         """
         if sub_pixel is None:
             sub_pixel = utils.from_currsys("!SIM.sub_pixel.flag")
         if spline_order is None:
             spline_order = utils.from_currsys("!SIM.computing.spline_order")
+        if method is None:
+            method = utils.from_currsys("!SIM.computing.resample_method")
 
         if isinstance(hdus_or_tables, (list, tuple)):
             for hdu_or_table in hdus_or_tables:
-                self.add(hdu_or_table, sub_pixel, spline_order, wcs_suffix)
+                self.add(hdu_or_table, sub_pixel, spline_order, wcs_suffix,
+                         method)
         else:
             if isinstance(hdus_or_tables, Table):
                 self.hdu.header["COMMENT"] = "Adding files from table"
@@ -114,7 +123,8 @@ class ImagePlane(ImagePlaneBase):
             elif isinstance(hdus_or_tables, fits.ImageHDU):
                 self.hdu.header["COMMENT"] = "Adding files from table"
                 self.hdu = add_imagehdu_to_imagehdu(hdus_or_tables, self.hdu,
-                                                    spline_order, wcs_suffix)
+                                                    spline_order, wcs_suffix,
+                                                    method=method)
 
     @property
     def header(self):
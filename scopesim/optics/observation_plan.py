@@ -0,0 +1,132 @@
+"""Defines ObservationPlan class"""
+import logging
+from copy import deepcopy
+
+import numpy as np
+from astropy import units as u
+
+from .fov import FieldOfView
+from .image_plane import ImagePlane
+from .. import rc
+from ..system_dict import ReadRecorder
+
+_MISSING = "<missing>"
+
+
+class ObservationPlan:
+    """
+    The parts of an observation that only depend on the optical system
+
+    A plan is compiled from an ``OpticalTrain``. It holds the headers and
+    wavelength ranges of all FieldOfView objects and the image plane headers.
+    The effects (and e.g. the PSF kernels they keep) stay in the optical
+    train, which is not reloaded while the plan is valid.
+
+    ``OpticalTrain.observe(src, plan=plan)`` reuses the plan for each new
+    Source. While compiling, the plan records which ``!``-parameters are
+    read (see ``dependencies``). It stays valid until one of these, or the
+    set of included effects, changes. A stale plan is compiled again before
+    it is used. Parameters only read later, e.g. ``!OBS.dit`` by the
+    detector effects during ``readout``, can therefore be changed without
+    recompiling the plan.
+
+    .. note:: Changes made directly to the ``.meta`` of an effect are not
+       tracked. Call ``compile()`` after such changes.
+
+    Parameters
+    ----------
+    optical_train : OpticalTrain
+    kwargs : expanded dict
+        Any keyword-value pairs from a config file. Passed to
+        ``OpticalTrain.update``
+
+    Examples
+    --------
+    ::
+
+        >>> plan = opt.compile_plan()
+        >>> for src in sources:
+        ...     opt.observe(src, plan=plan)
+        ...     hdul = opt.readout()
+
+    """
+    def __init__(self, optical_train, **kwargs):
+        self.optical_train = optical_train
+        self.kwargs = kwargs
+        self.fov_blueprints = []
+        self.image_plane_headers = []
+        self.dependencies = set()
+        self.n_compiles = 0
+        self._fingerprint = None
+
+        self.compile()
+
+    def compile(self):
+        """Reloads the optical train and sets up the FOVs and image planes"""
+        opt = self.optical_train
+        with ReadRecorder() as recorder:
+            opt.update(**self.kwargs)
+            opt.set_focus(**self.kwargs)
+
+            self.fov_blueprints = [(fov.header, fov.detector_header,
+                                    deepcopy(fov.meta))
+                                   for fov in opt.fov_manager.generate_fovs()]
+            self.image_plane_headers = [deepcopy(hdr) for hdr in
+                                        opt.optics_manager.image_plane_headers]
+
+        self.dependencies = recorder.keys
+        self._fingerprint = self._current_fingerprint()
+        self.n_compiles += 1
+
+    def is_valid(self):
+        """Returns True if the optical system has not changed since compile"""
+        return self._fingerprint == self._current_fingerprint()
+
+    def iter_fovs(self):
+        """Yields new, empty FieldOfView objects for one observation"""
+        for header, detector_header, meta in self.fov_blueprints:
+            meta = deepcopy(meta)
+            yield FieldOfView(header, (meta["wave_min"], meta["wave_max"]),
+                              detector_header=detector_header, **meta)
+
+    def make_image_planes(self):
+        """Returns new, empty ImagePlane objects for one observation"""
+        return [ImagePlane(hdr, **self.kwargs)
+                for hdr in self.image_plane_headers]
+
+    @property
+    def waveranges(self):
+        """The (wave_min, wave_max) of all FOVs"""
+        return [(meta["wave_min"], meta["wave_max"])
+                for _, _, meta in self.fov_blueprints]
+
+    def _current_fingerprint(self):
+        currsys = getattr(rc.__currsys__, "cmds", rc.__currsys__)
+        params = {key: currsys[key] if key in currsys else _MISSING
+                  for key in self.dependencies}
+        effects = [(eff.meta.get("name"), eff.include) for eff in
+                   self.optical_train.optics_manager.all_effects]
+        return _freeze(params), tuple(effects)
+
+    def __repr__(self):
+        return (f"<ObservationPlan> with {len(self.fov_blueprints)} FOVs and "
+                f"{len(self.image_plane_headers)} image planes")
+
+
+def _freeze(item):
+    """Returns a hashable, comparable copy of a nested dict of parameters"""
+    if isinstance(item, dict):
+        return tuple(sorted((str(key), _freeze(val))
+                            for key, val in item.items()))
+    if isinstance(item, (list, tuple)):
+        return tuple(_freeze(val) for val in item)
+    if isinstance(item, u.Quantity):
+        return str(item.unit), _freeze(item.value)
+    if isinstance(item, np.ndarray):
+        return item.dtype.str, item.shape, item.tobytes()
+    try:
+        hash(item)
+    except TypeError:
+        logging.debug(f"Unhashable parameter, compared by repr: {item}")
+        return repr(item)
+    return item
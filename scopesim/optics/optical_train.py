@@ -1,5 +1,8 @@
 import os
 import sys
+import logging
+import mmap
+import tempfile
 from copy import deepcopy
 from shutil import copyfileobj
 
@@ -15,12 +18,14 @@ from synphot.units import PHOTLAM
 
 from .optics_manager import OpticsManager
 from .fov_manager import FOVManager
+from .observation_plan import ObservationPlan
 from .image_plane import ImagePlane
 from ..commands.user_commands import UserCommands
 from ..detector import DetectorArray
 from ..effects import ExtraFitsKeywords
 from ..source.source import Source
-from ..utils import from_currsys
+from ..utils import from_currsys, get_n_workers, parallel_map, \
+    OrderedTurns, quantify
 from ..version import version
 from .. import effects
 from .. import rc
@@ -90,6 +95,10 @@ class OpticalTrain:
         self.image_planes = []
         self.detector_arrays = []
         self.yaml_dicts = None
+        self.spectrum_cache = None
+        self.table_indexes = None
+        self.image_cache = None
+        self._plan = None
         self._last_source = None
 
         if cmds is not None:
@@ -138,7 +147,24 @@ class OpticalTrain:
                                 for det_list in opt_man.detector_setup_effects]
 
 
-    def observe(self, orig_source, update=True, **kwargs):
+    def compile_plan(self, **kwargs):
+        """
+        Returns an ObservationPlan for observing many Sources with one setup
+
+        Parameters
+        ----------
+        kwargs : expanded dict
+            Any keyword-value pairs from a config file
+
+        Returns
+        -------
+        plan : ObservationPlan
+            Pass to ``observe(src, plan=plan)``
+
+        """
+        return ObservationPlan(self, **kwargs)
+
+    def observe(self, orig_source, update=True, plan=None, **kwargs):
         """
         Main controlling method for observing ``Source`` objects
 
@@ -147,6 +173,11 @@ class OpticalTrain:
         orig_source : Source
         update : bool
             Reload optical system
+        plan : ObservationPlan, optional
+            From ``compile_plan``. If given, the optical system is not
+            reloaded. The FOVs and image planes are set up from the plan,
+            which is compiled again first if the system has changed.
+            ``update`` is ignored
         kwargs : expanded dict
             Any keyword-value pairs from a config file
 
@@ -164,36 +195,64 @@ class OpticalTrain:
         .. todo:: List is out of date - update
 
         """
-        if update:
+        if plan is not None:
+            self.set_focus(**kwargs)
+            if not plan.is_valid():
+                logging.info("Optical system has changed, recompiling plan")
+                plan.compile()
+            self.image_planes = plan.make_image_planes()
+        elif update:
             self.update(**kwargs)
 
         self.set_focus(**kwargs)    # put focus back on current instrument package
+        self._plan = plan
 
         # Make a copy of the Source and prepare for observation (convert to
         # internally used units, sample to internal wavelength grid)
         source = orig_source.make_copy()
-        source = self.prepare_source(source)
+        is_imaging = not self.fov_manager.is_spectroscope
+        fov_waveranges = None
+        if len(source.cube_fields) > 0 or is_imaging:
+            fov_waveranges = self.fov_waveranges()
+        source = self.prepare_source(source, fov_waveranges)
 
         # [1D - transmission curves]
         for effect in self.optics_manager.source_effects:
             source = effect.apply_to(source)
 
+        # Integrate the spectra over the wavelength bins of all FOVs at once.
+        # The FOVs then sum their fluxes from the binned photons
+        if is_imaging and len(source.spectra) > 0:
+            edges = np.unique([quantify(wave, u.um).value
+                               for waverange in fov_waveranges
+                               for wave in waverange])
+            if len(edges) > 1:
+                source.photons_in_bins(edges * u.um)
+
         # [3D - Atmospheric shifts, PSF, NCPAs, Grating shift/distortion]
-        fovs = self.fov_manager.fovs
-        for fov in fovs:
-            # print("FOV", fov_i+1, "of", n_fovs, flush=True)
-            # .. todo: possible bug with bg flux not using plate_scale
-            #          see fov_utils.combine_imagehdu_fields
-            fov.extract_from(source)
-
-            hdu_type = "cube" if self.fov_manager.is_spectroscope else "image"
-            fov.view(hdu_type)
-            for effect in self.optics_manager.fov_effects:
-                fov = effect.apply_to(fov)
-
-            fov.flatten()
+        # All FOVs share one cache of evaluated spectra for this observation
+        self.spectrum_cache = fu.SpectrumCache(
+            max_size=from_currsys("!SIM.computing.spectrum_cache_size"))
+        # ... and one spatial index per table field
+        self.table_indexes = fu.TableIndexCache()
+        # ... and one resampled copy of each image field cut-out
+        self.image_cache = fu.ResampledImageCache(
+            max_size=from_currsys("!SIM.computing.image_cache_size"))
+
+        # In streaming mode only the FOV footprints are kept after each FOV
+        # has been added to the image plane
+        stream = from_currsys(self.fov_manager.meta["stream_fovs"]) is True
+        fovs = []
+        fovs_iter = self.fov_manager.iter_fovs() if plan is None else \
+            plan.iter_fovs()
+        for fov in self.observe_fovs(fovs_iter, source):
+            # FOVs arrive in list order, so the image planes are summed in
+            # the same order whether or not the FOVs were run in parallel
             self.image_planes[fov.image_plane_id].add(fov.hdu, wcs_suffix="D")
             # ..todo: finish off the multiple image plane stuff
+            if stream:
+                fov.clear()
+            fovs += [fov]
 
         # [2D - Vibration, flat fielding, chopping+nodding]
         for effect in self.optics_manager.image_plane_effects:
@@ -204,7 +263,86 @@ class OpticalTrain:
         self._last_source = source
 
 
-    def prepare_source(self, source):
+    def observe_fovs(self, fovs, source):
+        """
+        Yields the FOVs after they have been extracted, viewed, passed through
+        the FOV effects and flattened
+
+        If ``!SIM.computing.n_workers`` is larger than 1, the FOVs are
+        processed on a pool of threads. Each FOV effect still receives the
+        FOVs one at a time and in list order (effects may cache state between
+        calls), unless its ``meta["parallel_fovs"]`` is True. The FOVs are
+        always yielded in list order. The output is therefore identical to
+        the serial case.
+
+        Parameters
+        ----------
+        fovs : iterable of FieldOfView objects
+            Consumed lazily, e.g. ``FOVManager.iter_fovs()``
+        source : Source
+            A Source object which has already passed through ``prepare_source``
+            and the source effects
+
+        Yields
+        ------
+        fov : FieldOfView
+
+        """
+        hdu_type = "cube" if self.fov_manager.is_spectroscope else "image"
+        fov_effects = self.optics_manager.fov_effects
+
+        n_workers = get_n_workers()
+        # Effects that declare ``meta["parallel_fovs"]`` are stateless with
+        # respect to the FOVs and may be applied to several FOVs at once
+        turns = [OrderedTurns() if n_workers > 1 and not from_currsys(
+                     effect.meta.get("parallel_fovs", False)) else None
+                 for effect in fov_effects]
+
+        def _observe_fov(i_fov):
+            i, fov = i_fov
+            n_done = 0
+            try:
+                # .. todo: possible bug with bg flux not using plate_scale
+                #          see fov_utils.combine_imagehdu_fields
+                if self.spectrum_cache is not None:
+                    fov.spectrum_cache = self.spectrum_cache
+                fov.table_indexes = self.table_indexes
+                if self.image_cache is not None:
+                    fov.image_cache = self.image_cache
+                fov.extract_from(source)
+                fov.view(hdu_type)
+                for effect, turn in zip(fov_effects, turns):
+                    n_done += 1
+                    if turn is None:
+                        fov = effect.apply_to(fov)
+                    else:
+                        with turn(i):
+                            fov = effect.apply_to(fov)
+                fov.flatten()
+            finally:
+                # let the following FOVs pass, even if this one failed
+                for turn in turns[n_done:]:
+                    if turn is not None:
+                        turn.release(i)
+
+            return fov
+
+        yield from parallel_map(_observe_fov, enumerate(fovs), n_workers)
+
+    def fov_waveranges(self):
+        """
+        Returns the (wave_min, wave_max) of all FOVs
+
+        Taken from the ObservationPlan of the current observation, if there
+        is one, otherwise from the FOV volumes of the FOVManager. The FOVs
+        themselves are not created
+
+        """
+        if self._plan is not None:
+            return self._plan.waveranges
+        return self.fov_manager.waveranges
+
+    def prepare_source(self, source, fov_waveranges=None):
         """
         Prepare source for observation
 
@@ -217,33 +355,34 @@ class OpticalTrain:
         For cube fields, the method assumes that the wavelengths at which the
         cube is sampled is provided explicitely as attribute `wave` if the cube
         ImageHDU.
+        If ``!SIM.computing.lazy_cube_resampling`` is True, cube data are left
+        untouched. Each FieldOfView then converts and resamples only the slab
+        of the cube it covers.
+        The (wave_min, wave_max) of all FOVs may be passed as
+        ``fov_waveranges``. Otherwise they are taken from ``fov_waveranges()``
         """
         # Convert to PHOTLAM per arcsec2
         # ..todo: this is not sufficiently general
 
+        lazy = from_currsys("!SIM.computing.lazy_cube_resampling") is True
+
         for cube in source.cube_fields:
             header, data, wave = cube.header, cube.data, cube.wave
 
             # Need to check whether BUNIT is per arcsec2 or per pixel
             inunit = u.Unit(header['BUNIT'])
-            data = data.astype(np.float32) * inunit
             factor = 1
+            conversion = 1
             for base, power in zip(inunit.bases, inunit.powers):
                 if (base**power).is_equivalent(u.arcsec**(-2)):
-                    conversion =(base**power).to(u.arcsec**(-2)) / base**power
-                    data *= conversion
+                    conversion = (base**power).to(u.arcsec**(-2)) / base**power
                     factor = u.arcsec**(-2)
 
-            data = data.to(PHOTLAM,
-                           equivalencies=u.spectral_density(wave[:, None, None]))
-
             if factor == 1:    # Normalise to 1 arcsec2 if not a spatial density
                 # ..todo: lower needed because "DEG" is not understood, this is ugly
                 pixarea = (header['CDELT1'] * u.Unit(header['CUNIT1'].lower()) *
                            header['CDELT2'] * u.Unit(header['CUNIT2'].lower())).to(u.arcsec**2)
-                data = data / pixarea.value    # cube is per arcsec2
-
-            data = (data * factor).value
+                conversion /= pixarea.value    # cube is per arcsec2
 
             cube.header['BUNIT'] = 'PHOTLAM/arcsec2'    # ..todo: make this more explicit?
 
@@ -255,29 +394,52 @@ class OpticalTrain:
             cube.header['CUNIT2'] = 'deg'
 
             # Put on fov wavegrid
-            wave_min = min([fov.meta["wave_min"] for fov in self.fov_manager.fovs])
-            wave_max = max([fov.meta["wave_max"] for fov in self.fov_manager.fovs])
+            if fov_waveranges is None:
+                fov_waveranges = self.fov_waveranges()
+            wave_min = min(wmin for wmin, _ in fov_waveranges)
+            wave_max = max(wmax for _, wmax in fov_waveranges)
+
             wave_unit = u.Unit(from_currsys("!SIM.spectral.wave_unit"))
             dwave = from_currsys("!SIM.spectral.spectral_bin_width")  # Not a quantity
             fov_waveset = np.arange(wave_min.value, wave_max.value, dwave) * wave_unit
             fov_waveset = fov_waveset.to(u.um)
-
-            # Interpolate into new data cube.
-            # This is done layer by layer for memory reasons.
-            new_data = np.zeros((fov_waveset.shape[0], data.shape[1], data.shape[2]),
-                                dtype=np.float32)
-            for j in range(data.shape[1]):
-                cube_interp = interp1d(wave.to(u.um).value, data[:, j, :],
+            wave_hdr = {"CTYPE3": "WAVE",
+                        "CRPIX3": 1,
+                        "CRVAL3": wave_min.value,
+                        "CDELT3": dwave,
+                        "CUNIT3": wave_unit.name}
+
+            # Lazy mode: leave the data untouched. Each FOV converts and
+            # resamples only its own slab of the fov wavegrid in
+            # fu.extract_area_from_imagehdu
+            if lazy:
+                unit_scale = _unit_scale(inunit * conversion, wave)
+                if unit_scale is not None:
+                    cube.unit_scale = unit_scale
+                    cube.fov_waveset = fov_waveset
+                    cube.fov_wave_hdr = wave_hdr
+                    continue
+
+            # Convert and interpolate into a new data cube.
+            # This is done in slabs of rows for memory reasons. Large or
+            # memory-mapped cubes are resampled into a memory-mapped file.
+            new_shape = (fov_waveset.shape[0], data.shape[1], data.shape[2])
+            new_data = _empty_cube(new_shape, on_disk=_is_memmap(data))
+            row_bytes = 4 * (data.shape[0] + new_shape[0]) * data.shape[2]
+            slab_size = from_currsys("!SIM.computing.cube_slab_size") * 2**20
+            n_rows = max(1, int(slab_size // row_bytes))
+            for j in range(0, data.shape[1], n_rows):
+                slab = data[:, j:j + n_rows, :].astype(np.float32) * inunit
+                slab = (slab * conversion).to(
+                    PHOTLAM, equivalencies=u.spectral_density(wave[:, None, None]))
+                cube_interp = interp1d(wave.to(u.um).value, slab.value,
                                        axis=0, kind="linear",
                                        bounds_error=False, fill_value=0)
-                new_data[:, j, :] = cube_interp(fov_waveset.value)
+                new_data[:, j:j + n_rows, :] = cube_interp(fov_waveset.value)
 
             cube.data = new_data
-            cube.header['CTYPE3'] = 'WAVE'
-            cube.header['CRPIX3'] = 1
-            cube.header['CRVAL3'] = wave_min.value
-            cube.header['CDELT3'] = dwave
-            cube.header['CUNIT3'] = wave_unit.name
+            cube.owns_data = True       # not shared, may be changed in place
+            cube.header.update(wave_hdr)
 
         return source
 
@@ -516,3 +678,44 @@ class OpticalTrain:
         # etc
         #   limiting magnitudes
         #
+
+
+def _unit_scale(unit, wave):
+    """
+    Returns the factor per wavelength to convert ``unit`` to PHOTLAM
+
+    Returns None if the conversion is not a scaling, e.g. for magnitudes.
+    """
+    wave = wave[:, None]
+    values = np.array([1., 2.])[None, :] * unit
+    values = values.to(PHOTLAM, equivalencies=u.spectral_density(wave)).value
+    if not np.allclose(values[:, 1], 2 * values[:, 0]):
+        return None
+
+    return values[:, 0]
+
+
+def _is_memmap(data):
+    """Checks if an array (or the array it is a view of) is memory-mapped"""
+    while data is not None:
+        if isinstance(data, (np.memmap, mmap.mmap)):
+            return True
+        data = getattr(data, "base", None)
+    return False
+
+
+def _empty_cube(shape, on_disk=False):
+    """
+    Returns a float32 cube of zeros, memory-mapped to a temporary file if large
+
+    The cube is kept on disk if ``on_disk`` is set or if it is larger than
+    ``!SIM.computing.memmap_cube_size`` [MB]. The temporary file is removed as
+    soon as the cube is no longer referenced.
+    """
+    nbytes = 4 * np.prod(shape)
+    max_size = from_currsys("!SIM.computing.memmap_cube_size")
+    if not on_disk and (max_size is None or nbytes <= max_size * 2**20):
+        return np.zeros(shape, dtype=np.float32)
+
+    with tempfile.TemporaryFile(prefix="scopesim_cube_") as tmp:
+        return np.memmap(tmp, dtype=np.float32, mode="w+", shape=shape)
@@ -50,7 +50,7 @@ from synphot.units import PHOTLAM
 from ..optics.image_plane import ImagePlane
 from ..optics import image_plane_utils as imp_utils
 from .source_utils import validate_source_input, convert_to_list_of_spectra, \
-    photons_in_range
+    photons_in_range, photons_in_bins, copy_field_on_write
 from . import source_templates as src_tmp
 
 from ..base_classes import SourceBase
@@ -150,6 +150,7 @@ class Source(SourceBase):
         self.spectra = []
 
         self.bandpass = None
+        self._binned_photons = None
 
         validate_source_input(lam=lam, x=x, y=y, ref=ref, weight=weight,
                               spectra=spectra, table=table, cube=cube,
@@ -318,11 +319,12 @@ class Source(SourceBase):
             header = cube.header
             wcs = WCS(cube)
         else:
-            with fits.open(cube) as hdul:
+            # memmap: large cubes are only read slab-by-slab in prepare_source
+            with fits.open(cube, memmap=True) as hdul:
                 data = hdul[ext].data
                 header = hdul[ext].header
                 header['FILENAME'] = os.path.basename(cube)
-                wcs = WCS(cube)
+                wcs = WCS(hdul[ext], fobj=hdul)
 
         try:
             bunit = header['BUNIT']
@@ -445,11 +447,88 @@ class Source(SourceBase):
         if indexes is None:
             indexes = range(len(self.spectra))
 
+        counts = self._photons_from_bins(wave_min, wave_max, indexes)
+        if counts is not None:
+            if area is not None:
+                counts *= utils.quantify(area, u.m ** 2)
+            return counts
+
         spectra = [self.spectra[ii] for ii in indexes]
         counts = photons_in_range(spectra, wave_min, wave_max, area=area,
                                   bandpass=self.bandpass)
         return counts
 
+    def photons_in_bins(self, wave_edges, area=None, indexes=None):
+        """
+        Returns the photons of every spectrum in every bin of a wavelength grid
+
+        The (n_spectra, n_bins) matrix is integrated in one vectorised pass
+        and kept with the Source. As long as the spectra and bandpass are not
+        replaced, subsequent calls to ``photons_in_range`` with a range
+        that starts and ends on any of ``wave_edges`` are answered by
+        summing the slice of bins in between.
+
+        Parameters
+        ----------
+        wave_edges : array, u.Quantity
+            [um] Strictly increasing bin edges
+        area : float, u.Quantity, optional
+            [m2]
+        indexes : list of integers, optional
+
+        Returns
+        -------
+        counts : u.Quantity array
+            [ph / s / m2] if area is None
+            [ph / s] if area is passed
+
+        """
+        edges = np.atleast_1d(utils.quantify(wave_edges, u.um).value)
+        edges = edges.astype(float)
+
+        if not (self._binned_photons_are_current() and
+                np.array_equal(self._binned_photons["edges"], edges)):
+            counts = photons_in_bins(self.spectra, edges,
+                                     bandpass=self.bandpass)
+            self._binned_photons = {"edges": edges,
+                                    "counts": counts,
+                                    "spectra": list(self.spectra),
+                                    "bandpass": self.bandpass}
+
+        counts = self._binned_photons["counts"]
+        if indexes is not None:
+            counts = counts[list(indexes)]
+        else:
+            counts = counts.copy()
+        if area is not None:
+            counts *= utils.quantify(area, u.m ** 2)
+
+        return counts
+
+    def _binned_photons_are_current(self):
+        binned = getattr(self, "_binned_photons", None)
+        if binned is None or binned["bandpass"] is not self.bandpass or \
+                len(binned["spectra"]) != len(self.spectra):
+            return False
+        return all(spec is old_spec for spec, old_spec
+                   in zip(self.spectra, binned["spectra"]))
+
+    def _photons_from_bins(self, wave_min, wave_max, indexes):
+        """Sums the pre-binned photons, if wave_min/max lie on the bin edges"""
+        if not self._binned_photons_are_current():
+            return None
+
+        edges = self._binned_photons["edges"]
+        waves = [utils.quantify(wave, u.um).value
+                 for wave in (wave_min, wave_max)]
+        i_min, i_max = np.searchsorted(edges, waves)
+        if not (i_min < i_max < len(edges) and
+                np.allclose(edges[[i_min, i_max]], waves, rtol=1e-12, atol=0)):
+            return None
+
+        counts = self._binned_photons["counts"][list(indexes), i_min:i_max]
+        return np.sum(counts, axis=1)
+
     def fluxes(self, wave_min, wave_max, **kwargs):
         return self.photons_in_range(wave_min, wave_max, **kwargs)
 
@@ -497,11 +576,11 @@ class Source(SourceBase):
         for ii in layers:
             if isinstance(self.fields[ii], Table):
                 x = utils.quantity_from_table("x", self.fields[ii], u.arcsec)
-                x += utils.quantify(dx, u.arcsec)
+                x = x + utils.quantify(dx, u.arcsec)
                 self.fields[ii]["x"] = x
 
                 y = utils.quantity_from_table("y", self.fields[ii], u.arcsec)
-                y += utils.quantify(dy, u.arcsec)
+                y = y + utils.quantify(dy, u.arcsec)
                 self.fields[ii]["y"] = y
             elif isinstance(self.fields[ii], (fits.ImageHDU, fits.PrimaryHDU)):
                 dx = utils.quantify(dx, u.arcsec).to(u.deg)
@@ -544,16 +623,19 @@ class Source(SourceBase):
         plt.gca().set_aspect("equal")
 
     def make_copy(self):
+        """
+        Returns a copy-on-write copy of the Source
+
+        The fields and spectra of the copy share their data with the original.
+        Effects alter the copy by replacing spectra, columns and data arrays,
+        which leaves the original Source untouched.
+        """
         new_source = Source()
         new_source.meta = deepcopy(self.meta)
         new_source._meta_dicts = deepcopy(self._meta_dicts)
-        new_source.spectra = deepcopy(self.spectra)
-        for field in self.fields:
-            if isinstance(field, (fits.ImageHDU, fits.PrimaryHDU)) \
-                    and field._file is not None:  # and field._data_loaded is False:
-                new_source.fields += [field]
-            else:
-                new_source.fields += [deepcopy(field)]
+        new_source.spectra = list(self.spectra)
+        new_source.fields = [copy_field_on_write(field)
+                             for field in self.fields]
 
         return new_source
 
@@ -562,7 +644,7 @@ class Source(SourceBase):
         if isinstance(source_to_add, Source):
             for field in new_source.fields:
                 if isinstance(field, Table):
-                    field["ref"] += len(self.spectra)
+                    field["ref"] = field["ref"] + len(self.spectra)
                     self.fields += [field]
 
                 elif isinstance(field, (fits.ImageHDU, fits.PrimaryHDU)):
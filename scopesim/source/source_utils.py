@@ -1,4 +1,5 @@
 import logging
+from copy import deepcopy
 
 import numpy as np
 from astropy import wcs, units as u
@@ -123,6 +124,108 @@ def photons_in_range(spectra, wave_min, wave_max, area=None, bandpass=None):
     return counts
 
 
+def photons_in_bins(spectra, wave_edges, area=None, bandpass=None):
+    """
+    Integrates a list of spectra over all bins of a wavelength grid at once
+
+    Spectra which share a waveset are evaluated on the union of the bin edges
+    and their waveset, and integrated with a single cumulative trapezoid sum.
+    The counts in each bin are the differences of the cumulative integral at
+    the bin edges. Each bin is therefore integrated exactly as
+    ``photons_in_range(spectra, wave_edges[i], wave_edges[i+1])`` would do.
+
+    Parameters
+    ----------
+    spectra : list of SourceSpectrum
+    wave_edges : array, u.Quantity
+        [um] Strictly increasing bin edges of length (n_bins + 1)
+    area : Quantity
+        [m2]
+    bandpass : SpectralElement
+
+    Returns
+    -------
+    counts : u.Quantity array
+        Shape (n_spectra, n_bins). [ph s-1 m-2], or [ph s-1] if area is passed
+
+    """
+    edges = utils.quantify(wave_edges, u.um).to(u.Angstrom).value
+    edges = np.atleast_1d(edges).astype(float)
+    if len(edges) < 2 or np.any(np.diff(edges) <= 0):
+        raise ValueError("wave_edges must be strictly increasing and contain "
+                         "at least two values: {}".format(wave_edges))
+
+    # group spectra on the same waveset, e.g. those created from a lam array
+    groups = {}
+    for ii, spec in enumerate(spectra):
+        waveset = spec.waveset
+        key = None if waveset is None else waveset.value.tobytes()
+        if key not in groups:
+            groups[key] = (waveset, [])
+        groups[key][1].append(ii)
+
+    counts = np.zeros((len(spectra), len(edges) - 1))
+    for waveset, indexes in groups.values():
+        x = edges
+        if waveset is not None:
+            waveset = waveset.value
+            mask = (waveset > edges[0]) * (waveset < edges[-1])
+            x = np.union1d(edges, waveset[mask])
+
+        # y [ph s-1 cm-2 AA-1]
+        y = np.array([spectra[ii](x).value for ii in indexes])
+        if isinstance(bandpass, SpectralElement):
+            bandpass.model.bounds_error = True
+            y *= bandpass(x).value
+
+        cumulative = np.zeros_like(y)
+        cumulative[:, 1:] = np.cumsum(0.5 * (y[:, 1:] + y[:, :-1]) *
+                                      np.diff(x), axis=1)
+        cumulative = cumulative[:, np.searchsorted(x, edges)]
+        counts[indexes] = np.diff(cumulative, axis=1)
+
+    # counts = flux [ph s-1 cm-2]
+    counts = 1E4 * counts    # to get from cm-2 to m-2
+    counts *= u.ph * u.s**-1 * u.m**-2
+    if area is not None:
+        counts *= utils.quantify(area, u.m ** 2)
+
+    return counts
+
+
+def copy_field_on_write(field):
+    """
+    Returns a copy of a field which shares the data with the original
+
+    Tables share their column data, ImageHDUs their data array. Headers and
+    meta data are copied. Code changing a copied field must therefore replace
+    columns and data arrays (``tbl["x"] = x``, ``hdu.data = hdu.data * a``)
+    instead of writing into them (``tbl["x"] += dx``, ``hdu.data *= a``).
+
+    Parameters
+    ----------
+    field : Table, ImageHDU, PrimaryHDU
+
+    Returns
+    -------
+    new_field : Table, ImageHDU, PrimaryHDU
+
+    """
+    if isinstance(field, Table):
+        new_field = field.copy(copy_data=False)
+    elif isinstance(field, (fits.ImageHDU, fits.PrimaryHDU)):
+        new_field = field.__class__(data=field.data,
+                                    header=field.header.copy())
+        for attr in ["wave", "unit_scale", "fov_waveset", "fov_wave_hdr",
+                     "fov_throughput"]:
+            if hasattr(field, attr):
+                setattr(new_field, attr, getattr(field, attr))
+    else:
+        new_field = deepcopy(field)
+
+    return new_field
+
+
 def make_imagehdu_from_table(x, y, flux, pix_scale=1*u.arcsec):
 
     pix_scale = pix_scale.to(u.deg)
@@ -1,5 +1,7 @@
 import logging
 
+_RECORDERS = []
+
 
 class SystemDict(object):
     def __init__(self, new_dict=None):
@@ -35,6 +37,7 @@ class SystemDict(object):
 
     def __getitem__(self, item):
         if isinstance(item, str) and item[0] == "!":
+            _record_read(item)
             item_chunks = item[1:].split(".")
             entry = self.dic
             for item in item_chunks:
@@ -57,6 +60,7 @@ class SystemDict(object):
 
     def __contains__(self, item):
         if isinstance(item, str) and item[0] == "!":
+            _record_read(item)
             item_chunks = item[1:].split(".")
             entry = self.dic
             for item in item_chunks:
@@ -80,6 +84,40 @@ class SystemDict(object):
         return msg
 
 
+class ReadRecorder:
+    """
+    Records the bang-string keys read from any SystemDict
+
+    All reads made while the context is active are recorded, including those
+    made in worker threads. Lookups of missing keys (``"!A.b" in sys_dict``)
+    are recorded too, as adding the key may change the behaviour.
+
+    Examples
+    --------
+    ::
+
+        >>> with ReadRecorder() as recorder:
+        ...     opt.update()
+        >>> recorder.keys
+        {'!INST.pixel_scale', '!OBS.filter_name', ...}
+
+    """
+    def __init__(self):
+        self.keys = set()
+
+    def __enter__(self):
+        _RECORDERS.append(self)
+        return self
+
+    def __exit__(self, *args):
+        _RECORDERS.remove(self)
+
+
+def _record_read(key):
+    for recorder in _RECORDERS:
+        recorder.keys.add(key)
+
+
 def recursive_update(old_dict, new_dict):
     if new_dict is not None:
         for key in new_dict:
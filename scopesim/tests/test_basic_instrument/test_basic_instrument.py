@@ -6,6 +6,7 @@ import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.colors import LogNorm
 from astropy import units as u
+from astropy.io import fits
 
 import scopesim as sim
 from scopesim.source import source_templates as st
@@ -32,6 +33,21 @@ class TestLoadsOpticalTrain:
         assert opt["#slit_wheel.current_slit!"] == "narrow"
 
 
+def _cube_source():
+    """A 4x4 arcsec cube covering 0.7-2.5um"""
+    data = np.ones((181, 21, 21), dtype=np.float32) * 1e-17
+    data[:, 8:13, 8:13] *= 10
+    hdu = fits.ImageHDU(data=data)
+    hdu.header.update({"CTYPE1": "RA---TAN", "CTYPE2": "DEC--TAN",
+                       "CTYPE3": "WAVE", "CUNIT1": "arcsec",
+                       "CUNIT2": "arcsec", "CUNIT3": "um", "CDELT1": 0.2,
+                       "CDELT2": 0.2, "CDELT3": 0.01, "CRVAL1": 0,
+                       "CRVAL2": 0, "CRVAL3": 0.7, "CRPIX1": 11,
+                       "CRPIX2": 11, "CRPIX3": 1,
+                       "BUNIT": "erg s-1 cm-2 AA-1 arcsec-2"})
+    return sim.Source(cube=hdu)
+
+
 class TestObserveImagingMode:
     def test_runs(self):
         src = st.star(flux=9)
@@ -104,6 +120,32 @@ class TestObserveSpectroscopyMode:
             assert round(trace_flux / spot_flux) == round(n_spots[i])
 
 
+    def test_fovs_are_the_same_for_each_call(self):
+        cmd = sim.UserCommands(use_instrument="basic_instrument",
+                               set_modes=["spectroscopy"])
+        opt = sim.OpticalTrain(cmd)
+        fovs1 = opt.fov_manager.generate_fovs_list()
+        fovs2 = opt.fov_manager.generate_fovs_list()
+
+        assert len(fovs1) == len(fovs2)
+        for fov1, fov2 in zip(fovs1, fovs2):
+            assert fov1.volume() == fov2.volume()
+
+    def test_cube_flux_is_the_same_for_each_observation(self):
+        cmd = sim.UserCommands(use_instrument="basic_instrument",
+                               set_modes=["spectroscopy"])
+        opt = sim.OpticalTrain(cmd)
+        opt.observe(_cube_source())
+        n_fovs = len(opt._last_fovs)
+        flux = opt.image_planes[0].data.sum()
+        opt.observe(_cube_source())
+
+        assert flux > 0
+        assert n_fovs == len(opt.fov_manager.generate_fovs_list())
+        assert len(opt._last_fovs) == n_fovs
+        assert opt.image_planes[0].data.sum() == pytest.approx(flux)
+
+
 class TestObserveIfuMode:
     def test_runs(self):
         wave = np.arange(0.7, 2.5, 0.001)
@@ -167,6 +209,22 @@ class TestObserveIfuMode:
             plt.show()
 
 
+class TestLazyCubeResampling:
+    @pytest.mark.parametrize("mode", ["spectroscopy", "ifu"])
+    def test_lazy_and_eager_observations_are_identical(self, mode):
+        images = []
+        for lazy in [False, True]:
+            cmd = sim.UserCommands(use_instrument="basic_instrument",
+                                   set_modes=[mode])
+            cmd["!SIM.computing.lazy_cube_resampling"] = lazy
+            opt = sim.OpticalTrain(cmd)
+            opt.observe(_cube_source())
+            images += [opt.image_planes[0].data]
+
+        assert np.sum(images[0]) > 0
+        assert np.allclose(images[0], images[1], rtol=1e-6, atol=0)
+
+
 class TestFitsHeader:
     def test_source_keywords_in_header(self):
         src = st.star()
@@ -2,6 +2,7 @@
 
 import os
 import logging
+import threading
 import pytest
 import numpy as np
 from astropy import wcs
@@ -238,3 +239,17 @@ class TestLoadExampleOptTrain:
 
         assert isinstance(opt, OpticalTrain)
         assert from_currsys(opt["slit_wheel"].include) == True
+
+
+class TestParallelMap:
+    def test_results_are_in_order_of_the_iterable(self):
+        assert list(utils.parallel_map(lambda x: x**2, range(20), 4)) == \
+               [x**2 for x in range(20)]
+
+    def test_nested_maps_run_in_the_worker_thread(self):
+        def _inner_threads(_):
+            return set(utils.parallel_map(
+                lambda _: threading.get_ident(), range(8), 4))
+
+        for threads in utils.parallel_map(_inner_threads, range(4), 2):
+            assert len(threads) == 1
@@ -2,7 +2,7 @@ import pytest
 import copy
 import yaml
 
-from scopesim.system_dict import SystemDict, recursive_update
+from scopesim.system_dict import SystemDict, ReadRecorder, recursive_update
 
 _basic_yaml = """
 alias : OBS
@@ -73,6 +73,19 @@ class TestRecursiveUpdate:
         assert sys_dict["OBS"]["humidity"] == 0.75
 
 
+@pytest.mark.usefixtures("basic_yaml")
+class TestReadRecorder:
+    def test_records_bang_string_keys_read_inside_context(self, basic_yaml):
+        sys_dict = SystemDict(copy.deepcopy(basic_yaml))
+        sys_dict["!OBS.dit"] = 60
+        with ReadRecorder() as recorder:
+            assert sys_dict["!OBS.temperature"] == 100
+            assert "!OBS.humidity" not in sys_dict
+        assert sys_dict["!OBS.dit"] == 60
+
+        assert recorder.keys == {"!OBS.temperature", "!OBS.humidity"}
+
+
 class TestFunctionRecursiveUpdate:
     def test_recursive_update_combines_dicts(self):
         e = {"a": {"b": {"c": 1}}}
@@ -3,8 +3,12 @@ import pytest
 import numpy as np
 from astropy.io import fits
 
+from scopesim import rc
+from scopesim.effects import Effect, DetectorList, BasicReadoutNoise, \
+    ShotNoise
 from scopesim.optics.image_plane import ImagePlane
 from scopesim.detector import DetectorArray
+from scopesim.optics import image_plane_utils as imp_utils
 from scopesim.tests.mocks.py_objects import effects_objects as efs_objs
 
 
@@ -47,3 +51,102 @@ class TestReadout:
 
         assert np.all(hdu[1].data == 0)
         assert hdu[1].shape[0] == detector_list_effect.table["x_len"]
+
+    def test_aligned_window_matches_resampled_image(self, image_plane,
+                                                    detector_list_effect):
+        image_plane.hdu.data = np.random.random(image_plane.hdu.data.shape)
+        dtcr_arr = DetectorArray(detector_list_effect)
+        hdu = dtcr_arr.readout([image_plane])
+
+        detector = dtcr_arr.detectors[0]
+        assert detector.window_plan[1][0]       # grids are aligned
+        canvas = fits.ImageHDU(data=np.zeros(hdu[1].data.shape),
+                               header=detector.header)
+        canvas = imp_utils.add_imagehdu_to_imagehdu(image_plane.hdu, canvas,
+                                                    wcs_suffix="D")
+        assert np.array_equal(hdu[1].data, canvas.data)
+
+    def test_window_plan_is_reused_for_next_readout(self, image_plane,
+                                                    detector_list_effect,
+                                                    monkeypatch):
+        image_plane.hdu.data = np.random.random(image_plane.hdu.data.shape)
+        dtcr_arr = DetectorArray(detector_list_effect)
+        hdu1 = dtcr_arr.readout([image_plane])
+
+        def _no_windows(*args, **kwargs):
+            raise AssertionError("Detector windows were computed again")
+
+        monkeypatch.setattr(imp_utils, "overlay_windows", _no_windows)
+        hdu2 = dtcr_arr.readout([image_plane])
+        assert np.array_equal(hdu1[1].data, hdu2[1].data)
+
+
+class _DetectorOrder(Effect):
+    """Records the order in which the detectors pass by"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ids = []
+
+    def apply_to(self, det, **kwargs):
+        self.ids.append(det.meta["ID"])
+        return det
+
+
+@pytest.fixture(scope="function")
+def small_detector_list():
+    n = 4
+    return DetectorList(array_dict={"id": list(range(n)),
+                                    "x_cen": [0.4 * i for i in range(n)],
+                                    "y_cen": [0] * n,
+                                    "x_size": [32] * n,
+                                    "y_size": [32] * n,
+                                    "pixsize": [0.01] * n,
+                                    "angle": [0] * n,
+                                    "gain": [1] * n},
+                        x_cen_unit="mm", y_cen_unit="mm",
+                        x_size_unit="pixel", y_size_unit="pixel",
+                        image_plane_id=0)
+
+
+@pytest.mark.usefixtures("small_detector_list")
+class TestParallelReadout:
+    def _readout(self, det_list, dtcr_effects, n_workers, seed=9001):
+        keys = ["!SIM.computing.parallel_readout",
+                "!SIM.computing.n_workers", "!SIM.random.seed"]
+        old_values = [rc.__currsys__[key] for key in keys]
+        for key, val in zip(keys, [True, n_workers, seed]):
+            rc.__currsys__[key] = val
+        try:
+            implane = ImagePlane(header=det_list.image_plane_header)
+            implane.hdu.data = np.zeros((implane.header["NAXIS2"],
+                                         implane.header["NAXIS1"])) + 100
+            return DetectorArray(det_list).readout([implane], [],
+                                                   dtcr_effects)
+        finally:
+            for key, val in zip(keys, old_values):
+                rc.__currsys__[key] = val
+
+    def test_result_does_not_depend_on_n_workers(self, small_detector_list):
+        effects = [ShotNoise(), BasicReadoutNoise(noise_std=5, ndit=1)]
+        hdul1 = self._readout(small_detector_list, effects, n_workers=1)
+        hdul4 = self._readout(small_detector_list, effects, n_workers=4)
+
+        assert len(hdul4) == 5
+        for hdu1, hdu4 in zip(hdul1[1:], hdul4[1:]):
+            assert hdu1.header["ID"] == hdu4.header["ID"]
+            assert np.array_equal(hdu1.data, hdu4.data)
+
+    def test_detectors_have_independent_noise(self, small_detector_list):
+        effects = [BasicReadoutNoise(noise_std=5, ndit=1)]
+        hdul = self._readout(small_detector_list, effects, n_workers=4)
+
+        assert np.std(hdul[1].data) > 0
+        assert not np.array_equal(hdul[1].data, hdul[2].data)
+
+    def test_stateful_effects_see_detectors_in_order(self,
+                                                     small_detector_list):
+        order = _DetectorOrder()
+        hdul = self._readout(small_detector_list, [order], n_workers=4)
+
+        assert order.ids == list(range(4))
+        assert [hdu.header["ID"] for hdu in hdul[1:]] == ["0", "1", "2", "3"]
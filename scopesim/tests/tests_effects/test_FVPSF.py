@@ -24,9 +24,11 @@ from pytest import approx
 
 import numpy as np
 from astropy.io import fits
+from scipy.signal import convolve
 
 import scopesim.effects.psf_utils
 from scopesim import rc
+from scopesim.utils import parallel_map
 from scopesim.effects import FieldVaryingPSF
 from scopesim.tests.mocks.py_objects.fov_objects import _centre_fov
 from scopesim.tests.mocks.py_objects.psf_objects import _basic_circular_fvpsf
@@ -170,6 +172,52 @@ class TestApplyTo:
         # print(np.sum(fov_back.hdu.data), sum_orig)
         assert np.sum(fov_back.hdu.data) == approx(sum_orig, rel=1E-2)
 
+    def test_zone_windows_give_same_result_as_full_frame(self):
+        fov = _centre_fov(n=20)
+        fov.header["CRVAL1"] -= 15/3600.
+        fov.header["CRVAL2"] -= 15/3600.
+        fov.view()
+        fov.image = np.random.rand(fov.header["NAXIS2"], fov.header["NAXIS1"])
+        fov.fields = [1]
+        image = fov.image.copy()
+
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        expected = np.zeros(image.shape)
+        for kernel, mask in fvpsf.get_kernel(fov):
+            kernel = kernel / np.sum(kernel)
+            expected += convolve(image, kernel, mode="same") * \
+                        convolve(mask.astype(float), kernel, mode="same")
+
+        fov_back = fvpsf.apply_to(fov)
+
+        assert len(fvpsf.kernel) == 4
+        assert fov_back.image == approx(expected)
+
+    def test_parallel_fovs_give_identical_result_to_serial(self):
+        def _fovs():
+            fovs = []
+            for dx, dy in [(0, 0), (-15, -15), (15, 0), (-15, 15)] * 2:
+                fov = _centre_fov(n=20)
+                fov.header["CRVAL1"] += dx / 3600.
+                fov.header["CRVAL2"] += dy / 3600.
+                fov.view()
+                fov.image = np.random.default_rng(1).random(
+                    (fov.header["NAXIS2"], fov.header["NAXIS1"]))
+                fov.fields = [1]
+                fovs.append(fov)
+            return fovs
+
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        serial = [fvpsf.apply_to(fov).image for fov in _fovs()]
+
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        assert fvpsf.meta["parallel_fovs"]
+        parallel = list(parallel_map(lambda fov: fvpsf.apply_to(fov).image,
+                                     _fovs(), n_workers=4))
+
+        for image_serial, image_parallel in zip(serial, parallel):
+            assert np.array_equal(image_serial, image_parallel)
+
 
 class TestFunctionGetStrehlCutout:
     @pytest.mark.parametrize("scale", [0.2, 0.5, 1, 2])
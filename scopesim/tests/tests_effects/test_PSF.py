@@ -1,4 +1,6 @@
 """Unit tests for PSF and psf_utils"""
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from pytest import approx
 import numpy as np
@@ -8,6 +10,10 @@ from matplotlib.colors import LogNorm
 from scopesim.effects import PSF
 from scopesim.effects.psf_utils import rotational_blur
 from scopesim.effects.psf_utils import get_bkg_level
+from scopesim.effects.psf_utils import convolve, get_convolution_method
+from scopesim.effects.psf_utils import KernelFFTCache
+from scopesim.effects.psf_utils import get_mask_window, convolve_window
+from scipy.signal import convolve as sp_convolve
 from scopesim.optics import ImagePlane
 from scopesim.tests.mocks.py_objects.header_objects import _implane_header
 
@@ -174,3 +180,115 @@ class TestApplyTo:
 
         assert np.sum(implane.data[1, :, :]) == approx(1, rel=1e-2)
         assert implane.data[1, 75, 75] == approx(np.max(psf.kernel), rel=1e-2)
+
+    @pytest.mark.parametrize("method", ["direct", "fft", "oa"])
+    def test_all_convolve_methods_give_same_result(self, method):
+        implane = basic_image_plane()
+        implane.data[75, 75] = 1
+        psf = PSF(convolve_method="auto")
+        psf.kernel = basic_kernel(n=15)
+        auto_data = psf.apply_to(implane).data.copy()
+
+        implane = basic_image_plane()
+        implane.data[75, 75] = 1
+        psf = PSF(convolve_method=method)
+        psf.kernel = basic_kernel(n=15)
+        data = psf.apply_to(implane).data
+
+        assert data == approx(auto_data, abs=1e-12)
+
+    def test_kernel_fft_is_reused_for_repeated_kernels(self):
+        psf = PSF(convolve_method="fft")
+        psf.kernel = basic_kernel(n=15)
+        for _ in range(3):
+            implane = basic_image_plane()
+            implane.data[75, 75] = 1
+            psf.apply_to(implane)
+
+        assert psf._kernel_fft_cache.misses == 1
+        assert psf._kernel_fft_cache.hits == 2
+
+
+class TestConvolve:
+    @pytest.mark.parametrize("method", ["direct", "fft", "oa"])
+    @pytest.mark.parametrize("mode", ["same", "full"])
+    @pytest.mark.parametrize("image_shape, kernel_shape",
+                             [((50, 70), (7, 9)),
+                              ((3, 40, 30), (15, 15)),
+                              ((20, 20), (31, 25))])
+    def test_matches_scipy_convolve(self, image_shape, kernel_shape, mode,
+                                    method):
+        image = np.random.rand(*image_shape)
+        kernel = np.random.rand(*kernel_shape)
+        sp_kernel = kernel[None, :, :] if image.ndim == 3 else kernel
+
+        result = convolve(image, kernel, mode=mode, method=method)
+        expected = sp_convolve(image, sp_kernel, mode=mode)
+
+        assert result.shape == expected.shape
+        assert result == approx(expected)
+
+    @pytest.mark.parametrize("kernel_shape", [(1, 1), (7, 7), (8, 5)])
+    def test_convolve_window_matches_full_frame_for_mask_window(self,
+                                                                kernel_shape):
+        image = np.random.rand(60, 80)
+        kernel = np.random.rand(*kernel_shape)
+        mask = np.zeros(image.shape, dtype=bool)
+        mask[10:30, 50:78] = True
+
+        window = get_mask_window(mask, kernel.shape)
+        full_mask = sp_convolve(mask.astype(float), kernel, mode="same")
+        full_mask[window] = 0
+
+        assert np.all(np.abs(full_mask) < 1e-12)
+        assert convolve_window(image, kernel, window) == \
+               approx(sp_convolve(image, kernel, mode="same")[window])
+
+    def test_throws_error_for_unknown_method(self):
+        with pytest.raises(ValueError):
+            convolve(np.ones((10, 10)), np.ones((3, 3)), method="magic")
+
+    @pytest.mark.parametrize("image_shape, kernel_shape, method",
+                             [((16, 16), (3, 3), "direct"),
+                              ((256, 256), (64, 64), "fft"),
+                              ((2048, 2048), (15, 15), "oa")])
+    def test_auto_method_depends_on_sizes(self, image_shape, kernel_shape,
+                                          method):
+        assert get_convolution_method(image_shape, kernel_shape) == method
+
+
+class TestKernelFFTCache:
+    def test_cache_is_keyed_on_kernel_content_and_shape(self):
+        cache = KernelFFTCache()
+        kernel = basic_kernel(n=15)
+        cache.get(kernel, (32, 32))
+        cache.get(kernel.copy(), (32, 32))
+        cache.get(kernel, (64, 64))
+
+        assert cache.hits == 1
+        assert cache.misses == 2
+        assert len(cache) == 2
+
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = KernelFFTCache(max_size=2)
+        kernels = [basic_kernel(n=15) * (i + 1) for i in range(3)]
+        for kernel in kernels:
+            cache.get(kernel, (32, 32))
+        cache.get(kernels[0], (32, 32))
+
+        assert len(cache) == 2
+        assert cache.misses == 4
+
+    def test_can_be_shared_between_threads(self):
+        cache = KernelFFTCache(max_size=2)
+        kernels = [basic_kernel(n=15) * (i + 1) for i in range(4)] * 50
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            kernel_ffts = list(pool.map(lambda kernel: cache.get(kernel,
+                                                                 (32, 32)),
+                                        kernels))
+
+        for kernel, kernel_fft in zip(kernels, kernel_ffts):
+            assert np.allclose(kernel_fft, np.fft.rfftn(kernel, (32, 32)))
+        assert cache.hits + cache.misses == len(kernels)
+        assert len(cache) == 2
+
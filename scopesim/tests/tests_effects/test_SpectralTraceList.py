@@ -8,11 +8,13 @@ from astropy.wcs import WCS
 from matplotlib import pyplot as plt
 
 from scopesim.effects.spectral_trace_list import SpectralTraceList
+from scopesim.effects.spectral_trace_list_utils import Transform2D
 from scopesim.optics.fov_manager import FovVolumeList
 from scopesim.tests.mocks.py_objects import trace_list_objects as tlo
 from scopesim.tests.mocks.py_objects import header_objects as ho
 from scopesim.base_classes import PoorMansHeader
 from scopesim import rc
+from scopesim.utils import from_currsys
 
 MOCK_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
                                          "../mocks/MICADO_SPEC/"))
@@ -52,6 +54,36 @@ class TestInit:
                                 wave_colname="wavelength", s_colname="xi")
         assert isinstance(spt, SpectralTraceList)
 
+    @pytest.mark.usefixtures("full_trace_list")
+    def test_traces_share_one_map_cache(self, full_trace_list):
+        spt = SpectralTraceList(hdulist=full_trace_list)
+        caches = {id(trace.map_cache)
+                  for trace in spt.spectral_traces.values()}
+        assert caches == {id(spt.map_cache)}
+
+    @pytest.mark.usefixtures("full_trace_list")
+    def test_fitted_transforms_are_loaded_from_disk_cache(
+            self, full_trace_list, tmp_path, monkeypatch):
+        spt1 = SpectralTraceList(hdulist=full_trace_list,
+                                 fit_cache_path=str(tmp_path))
+        assert len(list(tmp_path.glob("trace_fit_*.npz"))) == \
+               len(spt1.spectral_traces)
+
+        def _no_refit(*args, **kwargs):
+            raise AssertionError("Transform2D was refitted")
+
+        monkeypatch.setattr(Transform2D, "fit", _no_refit)
+        spt2 = SpectralTraceList(hdulist=full_trace_list,
+                                 fit_cache_path=str(tmp_path))
+        for name, trace in spt1.spectral_traces.items():
+            assert np.all(trace.xy2lam.matrix ==
+                          spt2.spectral_traces[name].xy2lam.matrix)
+
+    @pytest.mark.usefixtures("full_trace_list")
+    def test_allows_parallel_fovs_by_default(self, full_trace_list):
+        spt = SpectralTraceList(hdulist=full_trace_list)
+        assert from_currsys(spt.meta["parallel_fovs"]) is True
+
 
 @pytest.mark.skip(reason="Ignoring old Spectroscopy integration tests")
 class TestGetFOVHeaders:
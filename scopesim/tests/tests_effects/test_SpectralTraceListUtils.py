@@ -7,8 +7,14 @@
 import pytest
 
 import numpy as np
+from scipy.interpolate import RectBivariateSpline
+from astropy import units as u
+from astropy.io import fits
 
 from scopesim.effects.spectral_trace_list_utils import Transform2D, power_vector
+from scopesim.effects.spectral_trace_list_utils import XiLamImage, \
+    TraceMapCache, linear_interp_weights, bilinear_sampler, \
+    apply_bilinear_sampler
 
 class TestPowerVec:
     """Test function power_vector()"""
@@ -106,3 +112,123 @@ class TestTransform2D:
         n_x, n_y = 4, 2
         res = tf2d(np.ones((n_y, n_x)), np.ones((n_y, n_x)), grid=False)
         assert res.shape == (n_y, n_x)
+
+    def test_grid_true_equals_grid_false_on_meshgrid(self, quadratic):
+        tf2d = Transform2D(quadratic['matrix'])
+        x, y = np.linspace(-2, 3, 7), np.linspace(0, 1, 4)
+        xx, yy = np.meshgrid(x, y)
+        assert tf2d(x, y, grid=True) == pytest.approx(
+            quadratic['function'](xx, yy))
+        assert tf2d(xx, yy, grid=False) == pytest.approx(
+            quadratic['function'](xx, yy))
+
+    def test_dtype_sets_the_output_type(self, quadratic):
+        tf2d = Transform2D(quadratic['matrix'])
+        res = tf2d(np.ones(5), np.ones(3), grid=True, dtype=np.float32)
+        assert res.dtype == np.float32
+
+    def test_gradient_is_only_computed_once(self, quadratic):
+        tf2d = Transform2D(quadratic['matrix'])
+        assert tf2d.gradient() is tf2d.gradient()
+
+
+class TestLinearInterpWeights:
+    """Tests for linear_interp_weights()"""
+    def test_interpolates_like_np_interp(self):
+        xp = np.array([0., 0.5, 2., 3.])
+        fp = np.array([1., -1., 4., 2.])
+        x = np.array([[-1., 0., 0.25], [1.2, 3., 7.]])
+        i, w = linear_interp_weights(xp, x)
+        assert fp[i] * (1 - w) + fp[i + 1] * w == pytest.approx(
+            np.interp(x, xp, fp))
+
+
+class TestBilinearSampler:
+    """Tests for bilinear_sampler() and apply_bilinear_sampler()"""
+    def test_samples_cube_like_spline_per_plane(self):
+        n_z, n_y, n_x = 4, 6, 5
+        cube = np.random.random((n_z, n_y, n_x))
+        x, y = np.meshgrid(np.linspace(-0.5, n_x - 0.2, 7),
+                           np.linspace(0.3, n_y + 0.5, 3))
+        sampler = bilinear_sampler(n_y, n_x, y, x)
+        samples = apply_bilinear_sampler(cube, sampler)
+
+        assert samples.shape == (n_z, 3, 7)
+        for plane, sample in zip(cube, samples):
+            spline = RectBivariateSpline(np.arange(n_y), np.arange(n_x),
+                                         plane, kx=1, ky=1)
+            assert sample == pytest.approx(spline(y, x, grid=False))
+
+
+class _CubeFOV:
+    """Minimal FieldOfView stand-in with a cube for XiLamImage"""
+    def __init__(self, n_lam=50, n_eta=7, n_xi=9):
+        cube = fits.ImageHDU(data=np.random.random((n_lam, n_eta, n_xi)))
+        cube.header.update({"CTYPE1": "LINEAR", "CTYPE2": "LINEAR",
+                            "CTYPE3": "WAVE", "CUNIT1": "arcsec",
+                            "CUNIT2": "arcsec", "CUNIT3": "um",
+                            "CDELT1": 0.2, "CDELT2": 0.1, "CDELT3": 0.001,
+                            "CRVAL1": 0, "CRVAL2": 0, "CRVAL3": 2.0,
+                            "CRPIX1": 1, "CRPIX2": 1, "CRPIX3": 1})
+        self.cube = cube
+        self.meta = {"xi_min": -0.8 * u.arcsec}
+
+
+class TestXiLamImage:
+    """Tests for XiLamImage()"""
+    @pytest.mark.parametrize("dlam_per_pix", [0, 0.00037, -0.0021, 0.02])
+    def test_image_is_identical_to_spline_per_eta_plane(self, dlam_per_pix):
+        fov = _CubeFOV()
+        xilam = XiLamImage(fov, dlam_per_pix)
+
+        n_lam, n_eta, n_xi = fov.cube.data.shape
+        cube_xi = 0.2 * np.arange(n_xi) - 0.8
+        cube_eta = 0.1 * (np.arange(n_eta) - (n_eta - 1) / 2)
+        image = np.zeros((n_xi, n_lam), dtype=np.float32)
+        for i, eta in enumerate(cube_eta):
+            lam0 = xilam.lam + dlam_per_pix * eta / 0.1
+            if lam0.min() < xilam.lam.max() and lam0.max() > xilam.lam.min():
+                spline = RectBivariateSpline(cube_xi, xilam.lam,
+                                             fov.cube.data[:, i, :].T,
+                                             kx=1, ky=1)
+                image += spline(cube_xi, lam0)
+        image *= 0.1
+
+        assert xilam.image == pytest.approx(image, rel=1e-5)
+
+
+class TestTraceMapCache:
+    """Tests for TraceMapCache"""
+    def _maps(self, n=100):
+        return lambda: (np.ones((n, n)), np.zeros((n, n)))
+
+    def test_maps_are_computed_once_per_window(self):
+        cache = TraceMapCache()
+        tfs = (object(), object())
+        maps1 = cache.get(tfs, (0, 1, 0.5), self._maps())
+        maps2 = cache.get(tfs, (0, 1, 0.5), self._maps())
+        cache.get(tfs, (0, 1, 0.6), self._maps())
+        cache.get((object(), tfs[1]), (0, 1, 0.5), self._maps())
+
+        assert maps1 is maps2
+        assert not maps1[0].flags.writeable
+        assert cache.hits == 1 and cache.misses == 3
+
+    def test_least_recently_used_maps_are_evicted(self):
+        cache = TraceMapCache(max_size=2 * 100**2 * 8 * 1.5 / 2**20)
+        tfs = (object(), object())
+        cache.get(tfs, (0, 1), self._maps())
+        cache.get(tfs, (1, 2), self._maps())
+        cache.get(tfs, (0, 1), self._maps())
+
+        assert len(cache) == 1
+        assert cache.misses == 3
+
+    def test_zero_size_cache_stores_nothing(self):
+        cache = TraceMapCache(max_size=0)
+        tfs = (object(), object())
+        cache.get(tfs, (0, 1), self._maps())
+        cache.get(tfs, (0, 1), self._maps())
+
+        assert len(cache) == 0
+        assert cache.misses == 2
@@ -5,6 +5,7 @@ import numpy as np
 
 from scopesim.optics.fov import FieldOfView
 from scopesim.optics.fov_manager import FOVManager
+from scopesim.effects import DetectorList
 
 from scopesim.tests.mocks.py_objects import effects_objects as eo
 from scopesim.tests.mocks.py_objects import yaml_objects as yo
@@ -15,6 +16,21 @@ import matplotlib.pyplot as plt
 PLOTS = False
 
 
+def _two_detectors():
+    return DetectorList(array_dict={"id": [1, 2],
+                                    "x_cen": [-10., 10.],
+                                    "y_cen": [0., 0.],
+                                    "x_size": [1., 1.],
+                                    "y_size": [1., 1.],
+                                    "pixel_size": [0.01, 0.01],
+                                    "angle": [0., 0.],
+                                    "gain": [1., 1.]},
+                            x_cen_unit="mm", y_cen_unit="mm",
+                            x_size_unit="mm", y_size_unit="mm",
+                            pixel_size_unit="mm", angle_unit="deg",
+                            gain_unit="electron/adu", image_plane_id=0)
+
+
 class TestInit:
     def test_initialises_with_nothing(self):
         assert isinstance(FOVManager(preload_fovs=False), FOVManager)
@@ -53,6 +69,63 @@ class TestGenerateFovList:
         assert fov_volume["xs"][0] == -1024 / 3600      # [deg] 2k detector / pixel_scale
         assert fov_volume["waves"][0] == 0.6            # [um] filter blue edge
 
+    def test_generate_fovs_yields_same_fovs_as_list(self):
+        effects = eo._mvs_effects_list()
+        fov_man = FOVManager(effects=effects, pixel_scale=1, plate_scale=1,
+                             max_segment_size=1024**2, chunk_size=1024)
+        fovs_list = fov_man.generate_fovs_list()
+        fovs_gen = fov_man.generate_fovs()
+
+        assert not isinstance(fovs_gen, list)
+        for fov_list, fov_gen in zip(fovs_list, fovs_gen):
+            assert fov_list.volume() == fov_gen.volume()
+
+    def test_waveranges_are_those_of_the_fovs(self):
+        fov_man = FOVManager(effects=[_two_detectors()], pixel_scale=1,
+                             plate_scale=1, max_segment_size=100**2,
+                             chunk_size=100, detector_margin=1)
+        fovs = fov_man.generate_fovs_list()
+
+        assert len(fovs) == 4
+        assert fov_man.waveranges == [(fov.meta["wave_min"],
+                                       fov.meta["wave_max"]) for fov in fovs]
+
+    def test_iter_fovs_is_lazy_in_streaming_mode(self):
+        effects = eo._mvs_effects_list()
+        fov_man = FOVManager(effects=effects, pixel_scale=1, plate_scale=1,
+                             stream_fovs=True)
+        fovs_iter = fov_man.iter_fovs()
+
+        assert not isinstance(fovs_iter, list)
+        assert isinstance(next(fovs_iter), FieldOfView)
+
+    @pytest.mark.parametrize("margin, n_fovs", [(None, 21), (1, 4)])
+    def test_fovs_far_from_all_detectors_are_skipped(self, margin, n_fovs):
+        fov_man = FOVManager(effects=[_two_detectors()], pixel_scale=1,
+                             plate_scale=1, max_segment_size=100**2,
+                             chunk_size=100, detector_margin=margin)
+        fovs = fov_man.generate_fovs_list()
+
+        assert len(fovs) == n_fovs
+        assert len(fovs) + fov_man.n_pruned_fovs == 21
+
+    def test_n_pruned_fovs_is_known_after_the_first_fov(self):
+        fov_man = FOVManager(effects=[_two_detectors()], pixel_scale=1,
+                             plate_scale=1, max_segment_size=100**2,
+                             chunk_size=100, detector_margin=1)
+        next(fov_man.generate_fovs())
+
+        assert fov_man.n_pruned_fovs == 17
+
+    def test_fovs_are_not_pruned_by_default(self):
+        fov_man = FOVManager(effects=[_two_detectors()], pixel_scale=1,
+                             plate_scale=1, max_segment_size=100**2,
+                             chunk_size=100)
+        fovs = fov_man.generate_fovs_list()
+
+        assert len(fovs) == 21
+        assert fov_man.n_pruned_fovs == 0
+
     def test_fov_volumes_have_detector_dimensions_from_detector_list(self):
         effects = eo._mvs_effects_list()
         fov_man = FOVManager(effects=effects, pixel_scale=1, plate_scale=1)
@@ -6,10 +6,11 @@ from astropy.io import fits
 from matplotlib import pyplot as plt
 from matplotlib.colors import LogNorm
 
+from scopesim import rc
 from scopesim.tests.mocks.py_objects import header_objects as ho
 from scopesim.tests.mocks.py_objects import source_objects as so
 from scopesim.optics.fov import FieldOfView
-from scopesim.optics.fov_utils import get_cube_waveset
+from scopesim.optics.fov_utils import get_cube_waveset, ResampledImageCache
 
 PLOTS = False
 
@@ -486,3 +487,29 @@ class TestMakeSpectrumImageCubeAllPlayNicely:
         image_sum = np.sum(fov.make_image_hdu().data)
 
         assert cube_sum == approx(image_sum, rel=0.05)
+
+
+class TestImageCache:
+    @pytest.mark.parametrize("hdu_type", ["image", "cube"])
+    def test_image_fields_are_resampled_once_for_fovs_of_same_area(
+            self, hdu_type):
+        bin_width = rc.__currsys__["!SIM.spectral.spectral_bin_width"]
+        rc.__currsys__["!SIM.spectral.spectral_bin_width"] = 0.01
+        try:
+            src_image = so._image_source(dx=-4, dy=-4)
+            cache = ResampledImageCache()
+            fovs = [_fov_190_210_um(), _fov_197_202_um()]
+            for fov in fovs:
+                fov.image_cache = cache
+                fov.extract_from(src_image)
+                fov.view(hdu_type)
+
+            fresh_fov = _fov_197_202_um()
+            fresh_fov.extract_from(src_image)
+            fresh_fov.view(hdu_type)
+        finally:
+            rc.__currsys__["!SIM.spectral.spectral_bin_width"] = bin_width
+
+        assert cache.hits == 1 and cache.misses == 1
+        assert np.sum(fovs[1].hdu.data) > 0
+        assert fovs[1].hdu.data == approx(fresh_fov.hdu.data)
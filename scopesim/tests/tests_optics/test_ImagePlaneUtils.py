@@ -154,6 +154,55 @@ class TestAddImageHDUtoImageHDU:
         assert np.sum(new.data) == small_sum
 
 
+    def test_aligned_hdu_is_added_in_place(self):
+        big, small = self.big_small_hdus(small_offsets=(3, 2))
+        big_data = big.data
+        new = imp_utils.add_imagehdu_to_imagehdu(small, big)
+
+        assert new.data is big_data
+        assert np.sum(new.data) == np.sum(small.data) + np.size(big_data)
+
+    @pytest.mark.parametrize("pixel_scale, xy0", [(0.05, (170.3, 230.7)),
+                                                  (0.1, (140.2, 160.9)),
+                                                  (0.02, (260.6, 240.1))])
+    def test_zoomed_image_lands_on_the_same_spot_of_a_smaller_canvas(
+            self, pixel_scale, xy0):
+        # An image much larger than the canvas must not be cropped before it
+        # is zoomed, as this moves the zoom sampling grid
+        edges = np.array([-250, 250]) * pixel_scale / 3600
+        hdr = imp_utils.header_from_list_of_xy(edges, edges,
+                                               pixel_scale / 3600)
+        hdr["CRPIX1"] += 0.3
+        hdr["CRPIX2"] -= 0.2
+        yy, xx = np.mgrid[:500, :500]
+        sigma = 0.45 / pixel_scale
+        image = fits.ImageHDU(header=hdr, data=np.exp(
+            -((xx - xy0[0])**2 + (yy - xy0[1])**2) / (2 * sigma**2)))
+        x0, y0 = imp_utils.pix2val(hdr, *xy0)
+
+        edges = np.array([-40, 40]) / 3600
+        big = imp_utils.header_from_list_of_xy(edges + x0 + 1e-5,
+                                               edges + y0 - 2e-5, 0.15 / 3600)
+        # a 40x40 pixel window of the big canvas around the image centroid
+        small = big.copy()
+        xc, yc = imp_utils.val2pix(big, x0, y0)
+        small["NAXIS1"], small["NAXIS2"] = 40, 40
+        small["CRPIX1"] -= int(xc) - 20
+        small["CRPIX2"] -= int(yc) - 20
+
+        centroids = []
+        for hdr in (big, small):
+            canvas = fits.ImageHDU(header=hdr, data=np.zeros((hdr["NAXIS2"],
+                                                              hdr["NAXIS1"])))
+            new = imp_utils.add_imagehdu_to_imagehdu(deepcopy(image), canvas)
+            cy, cx = np.mgrid[:new.data.shape[0], :new.data.shape[1]]
+            xs, ys = imp_utils.pix2val(new.header,
+                                       np.sum(cx * new.data) / new.data.sum(),
+                                       np.sum(cy * new.data) / new.data.sum())
+            centroids += [np.array([xs, ys]) * 3600 / 0.15]   # [pixel]
+
+        assert centroids[1] == approx(centroids[0], abs=0.01)
+
     def test_python_image_coords(self):
         # numpy uses a system of im[y, x]
         # numpy.shape[0] = y_len, numpy.shape[1] = x_len
@@ -256,6 +305,110 @@ class TestRescaleImageHDU:
         assert hdr1["NAXIS3"] == hdr0["NAXIS3"]
 
 
+class TestResampleExact:
+    def test_block_sums_when_downscaled_by_integer_factor(self):
+        image = np.random.random((6, 8))
+        new = imp_utils.resample_exact(image, np.eye(2) / 2, (0, 0), (3, 4))
+        assert new == approx(image.reshape(3, 2, 4, 2).sum(axis=(1, 3)))
+
+    def test_integer_offset_moves_image(self):
+        image = np.random.random((6, 8))
+        new = imp_utils.resample_exact(image, np.eye(2), (3, 1), (10, 12))
+        assert new[1:7, 3:11] == approx(image)
+        assert np.sum(new) == approx(np.sum(image))
+
+    @pytest.mark.parametrize("angle", [0, 30, -45, 90])
+    def test_rotated_pixel_is_split_by_overlap_area(self, angle):
+        ang = np.deg2rad(angle)
+        mat = 0.7 * np.array([[np.cos(ang), -np.sin(ang)],
+                              [np.sin(ang), np.cos(ang)]])
+        image = np.zeros((5, 5))
+        image[2, 3] = 1
+        new = imp_utils.resample_exact(image, mat, (10.3, 10.1), (20, 20))
+
+        # count the flux of a fine grid of points inside the input pixel
+        n = 200
+        x, y = np.meshgrid((np.arange(n) + 0.5) / n + 3,
+                           (np.arange(n) + 0.5) / n + 2)
+        xo, yo = mat @ np.array([x.ravel(), y.ravel()]) + \
+            np.array([[10.3], [10.1]])
+        counts = np.zeros((20, 20))
+        np.add.at(counts, (yo.astype(int), xo.astype(int)), 1 / n**2)
+
+        assert np.sum(new) == approx(1)
+        assert new == approx(counts, abs=0.01)
+
+    def test_cube_is_resampled_layer_by_layer(self):
+        image = np.random.random((6, 8))
+        cube = image[None, :, :] * np.arange(1, 4)[:, None, None]
+        mat = np.array([[1.2, 0.3], [-0.3, 1.2]])
+        new_image = imp_utils.resample_exact(image, mat, (5, 5), (20, 20))
+        new_cube = imp_utils.resample_exact(cube, mat, (5, 5), (20, 20))
+
+        assert new_cube.shape == (3, 20, 20)
+        assert np.sum(new_image) == approx(np.sum(image))
+        assert new_cube[2] == approx(3 * new_image)
+
+    @pytest.mark.parametrize("angle", [0, 30])
+    def test_is_selectable_in_add_imagehdu_to_imagehdu(self, angle):
+        hdu = imo._image_hdu_rect()
+        ang = np.deg2rad(angle)
+        hdu.header.update({"PC1_1": np.cos(ang), "PC1_2": np.sin(ang),
+                           "PC2_1": -np.sin(ang), "PC2_2": np.cos(ang)})
+        edges = np.array([-110, 110]) / 3600
+        canvas = imp_utils.header_from_list_of_xy(edges, edges, 0.3 / 3600)
+        canvas = fits.ImageHDU(header=canvas,
+                               data=np.zeros((canvas["NAXIS2"],
+                                              canvas["NAXIS1"])))
+        new = imp_utils.add_imagehdu_to_imagehdu(hdu, canvas, method="exact")
+
+        assert np.sum(new.data) == approx(np.sum(hdu.data))
+
+    def test_rotated_images_fall_back_to_spline(self):
+        hdu = imo._image_hdu_rect()
+        ang = np.deg2rad(30)
+        hdu.header.update({"PC1_1": np.cos(ang), "PC1_2": np.sin(ang),
+                           "PC2_1": -np.sin(ang), "PC2_2": np.cos(ang)})
+        edges = np.array([-110, 110]) / 3600
+        canvas = imp_utils.header_from_list_of_xy(edges, edges, 0.3 / 3600)
+        canvas = fits.ImageHDU(header=canvas,
+                               data=np.zeros((canvas["NAXIS2"],
+                                              canvas["NAXIS1"])))
+        exact = imp_utils.add_imagehdu_to_imagehdu(deepcopy(hdu),
+                                                   deepcopy(canvas),
+                                                   method="exact")
+        spline = imp_utils.add_imagehdu_to_imagehdu(deepcopy(hdu), canvas)
+
+        assert np.array_equal(exact.data, spline.data)
+
+    @pytest.mark.parametrize("scale", [1.5, 1.2, 0.7])
+    def test_scaled_image_keeps_its_centroid(self, scale):
+        edges = np.array([-5, 5]) / 3600
+        hdr = imp_utils.header_from_list_of_xy(edges, edges, 0.1 / 3600)
+        yy, xx = np.mgrid[:hdr["NAXIS2"], :hdr["NAXIS1"]]
+        hdu = fits.ImageHDU(header=hdr, data=np.exp(
+            -((xx - 40.3)**2 + (yy - 55.8)**2) / (2 * 4.**2)))
+        canvas = imp_utils.header_from_list_of_xy(edges + 1e-5, edges - 2e-5,
+                                                  0.1 * scale / 3600)
+        canvas = fits.ImageHDU(header=canvas,
+                               data=np.zeros((canvas["NAXIS2"],
+                                              canvas["NAXIS1"])))
+        new = imp_utils.add_imagehdu_to_imagehdu(hdu, canvas, method="exact")
+
+        yy, xx = np.mgrid[:new.data.shape[0], :new.data.shape[1]]
+        xc = np.sum(xx * new.data) / np.sum(new.data)
+        yc = np.sum(yy * new.data) / np.sum(new.data)
+        x0, y0 = imp_utils.val2pix(canvas.header,
+                                   *imp_utils.pix2val(hdr, 40.3, 55.8))
+        assert (xc, yc) == approx((x0, y0), abs=0.005)
+
+    def test_unknown_method_raises_error(self):
+        hdu = imo._image_hdu_rect()
+        with pytest.raises(ValueError):
+            imp_utils.add_imagehdu_to_imagehdu(hdu, deepcopy(hdu),
+                                               method="bogus")
+
+
 class TestReorientImageHDU:
     @pytest.mark.parametrize("angle", [0, 30, -45])
     def test_reorients_a_2D_imagehdu(self, angle):
@@ -335,3 +488,47 @@ class TestSubPixelFractions:
     #     print(xs)
 
 
+class TestAddPointsToCanvas:
+    def test_points_on_the_same_pixel_are_all_added(self):
+        canvas = np.zeros((10, 10))
+        imp_utils.add_points_to_canvas(canvas, [2.3, 2.7, 5.], [4.1, 4.9, 5.],
+                                       [1., 2., 3.])
+        assert canvas[4, 2] == 3.
+        assert canvas[5, 5] == 3.
+        assert np.sum(canvas) == 6.
+
+    def test_sub_pixel_matches_sub_pixel_fractions(self):
+        x, y = np.random.uniform(0, 9, (2, 50))
+        flux = np.random.uniform(1, 2, 50)
+        expected = np.zeros((10, 10))
+        for xi, yi, fi in zip(x, y, flux):
+            xs, ys, fracs = imp_utils.sub_pixel_fractions(xi, yi)
+            for xx, yy, frac in zip(xs, ys, fracs):
+                expected[yy, xx] += frac * fi
+
+        canvas = imp_utils.add_points_to_canvas(np.zeros((10, 10)), x, y,
+                                                flux, sub_pixel=True)
+        assert canvas == approx(expected)
+
+    @pytest.mark.parametrize("sub_pixel", [True, False])
+    def test_points_outside_the_canvas_are_ignored(self, sub_pixel):
+        canvas = imp_utils.add_points_to_canvas(np.zeros((10, 10)),
+                                                [-3., 12., 9.5, 5.],
+                                                [5., 5., 9.5, 5.],
+                                                1., sub_pixel=sub_pixel)
+        assert np.sum(canvas) == approx(1.25 if sub_pixel else 2.)
+
+    @pytest.mark.parametrize("sub_pixel", [True, False])
+    def test_cube_gets_flux_times_spectrum(self, sub_pixel):
+        spectrum = np.arange(1, 6)
+        canvas = np.zeros((5, 10, 10))
+        imp_utils.add_points_to_canvas(canvas, [1., 1., 7.5], [2., 2., 3.],
+                                       [1., 2., 4.], sub_pixel=sub_pixel,
+                                       spectrum=spectrum)
+        assert canvas[:, 2, 1] == approx(3 * spectrum)
+        assert np.sum(canvas, axis=(1, 2)) == approx(7 * spectrum)
+
+    def test_throws_error_for_cube_without_spectrum(self):
+        with pytest.raises(ValueError):
+            imp_utils.add_points_to_canvas(np.zeros((5, 10, 10)), [1.], [1.],
+                                           [1.])
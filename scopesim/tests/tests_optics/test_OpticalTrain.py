@@ -6,6 +6,9 @@ from pytest import approx
 import numpy as np
 from astropy import units as u
 from astropy.table import Table
+from astropy.io import fits
+from synphot import SpectralElement, Empirical1D
+from synphot.units import PHOTLAM
 
 import scopesim as sim
 from scopesim import rc
@@ -15,7 +18,10 @@ from scopesim.optics.optical_train import OpticalTrain
 from scopesim.optics.optics_manager import OpticsManager
 from scopesim.optics.optical_element import OpticalElement
 from scopesim.commands.user_commands import UserCommands
+from scopesim.source.source import Source
+from scopesim.source.source_utils import photons_in_range
 from scopesim.effects import Effect, DetectorList, DarkCurrent
+from scopesim.effects.ter_curves_utils import apply_throughput_to_cube
 from scopesim.utils import find_file
 
 from scopesim.tests.mocks.py_objects import source_objects as src_objs
@@ -43,6 +49,15 @@ def _unity_cmds():
     return UserCommands(yamls=[find_file("CMD_unity_cmds.yaml")])
 
 
+def _chunked_cmds():
+    # small pixels and chunks, so that the field is split into several FOVs
+    cmds = _basic_cmds()
+    cmds["SIM_PIXEL_SCALE"] = 0.02
+    cmds["!SIM.computing.chunk_size"] = 512
+    cmds["!SIM.computing.max_segment_size"] = 512**2
+    return cmds
+
+
 @pytest.fixture(scope="function")
 def cmds():
     return _basic_cmds()
@@ -53,6 +68,11 @@ def unity_cmds():
     return _unity_cmds()
 
 
+@pytest.fixture(scope="function")
+def chunked_cmds():
+    return _chunked_cmds()
+
+
 @pytest.fixture(scope="function")
 def tbl_src():
     return src_objs._table_source()
@@ -213,6 +233,230 @@ class TestObserve:
         assert np.sum(opt.image_planes[0].data) > 0
 
 
+    @pytest.mark.parametrize("n_workers", [2, 4, -1])
+    def test_parallel_fovs_give_identical_result_to_serial(self, chunked_cmds,
+                                                           im_src, n_workers):
+        opt = OpticalTrain(chunked_cmds)
+        opt.cmds["!SIM.computing.n_workers"] = 1
+        opt.observe(im_src)
+        serial_image = np.copy(opt.image_planes[0].data)
+
+        opt.cmds["!SIM.computing.n_workers"] = n_workers
+        opt.observe(im_src)
+        parallel_image = opt.image_planes[0].data
+
+        assert len(opt._last_fovs) > 1
+        assert np.sum(serial_image) > 0
+        assert np.array_equal(serial_image, parallel_image)
+
+    def test_table_fields_are_indexed_once_for_all_fovs(self, chunked_cmds,
+                                                        tbl_src):
+        opt = OpticalTrain(chunked_cmds)
+        opt.observe(tbl_src)
+
+        assert len(opt._last_fovs) > 1
+        assert len(opt.table_indexes) == len(tbl_src.table_fields)
+        assert np.sum(opt.image_planes[0].data) > 0
+
+    def test_spectra_evaluations_are_shared_between_fovs(self, chunked_cmds,
+                                                         tbl_src):
+        opt = OpticalTrain(chunked_cmds)
+        opt.observe(tbl_src)
+
+        cache = opt.spectrum_cache
+        assert len(opt._last_fovs) > 1
+        assert cache.hits > 0
+
+    def test_fov_fluxes_are_taken_from_the_binned_photons(self,
+                                                          chunked_cmds,
+                                                          tbl_src):
+        opt = OpticalTrain(chunked_cmds)
+        opt.observe(tbl_src)
+
+        source = opt._last_source
+        assert source._binned_photons is not None
+        for fov in opt._last_fovs:
+            wave_min, wave_max = fov.meta["wave_min"], fov.meta["wave_max"]
+            assert source._photons_from_bins(wave_min, wave_max,
+                                             [0]) is not None
+            counts = photons_in_range(source.spectra, wave_min, wave_max,
+                                      bandpass=source.bandpass)
+            binned = source.photons_in_range(wave_min, wave_max)
+            assert np.allclose(binned.value, counts.value, rtol=1e-10)
+
+    def test_observing_with_a_plan_gives_identical_result(self,
+                                                          chunked_cmds,
+                                                          im_src):
+        opt = OpticalTrain(chunked_cmds)
+        opt.observe(im_src)
+        image = np.copy(opt.image_planes[0].data)
+
+        plan = opt.compile_plan()
+        opt.observe(im_src, plan=plan)
+        plan_image = np.copy(opt.image_planes[0].data)
+        opt.observe(im_src, plan=plan)
+
+        assert len(plan.fov_blueprints) > 1
+        assert plan.n_compiles == 1
+        assert np.array_equal(image, plan_image)
+        assert np.array_equal(image, opt.image_planes[0].data)
+
+    def test_observing_a_cube_with_a_plan_gives_identical_result(self, cmds):
+        hdu = _cube_hdu()
+        opt = OpticalTrain(cmds)
+        opt.observe(Source(cube=deepcopy(hdu)))
+        image = np.copy(opt.image_planes[0].data)
+
+        opt.observe(Source(cube=deepcopy(hdu)), plan=opt.compile_plan())
+
+        assert np.sum(image) > 0
+        assert np.array_equal(image, opt.image_planes[0].data)
+
+    def test_plan_is_recompiled_when_a_bang_parameter_changes(self, cmds,
+                                                              im_src):
+        opt = OpticalTrain(cmds)
+        plan = opt.compile_plan()
+        assert plan.is_valid()
+
+        opt.cmds["!SIM.computing.chunk_size"] = 64
+        assert not plan.is_valid()
+        opt.observe(im_src, plan=plan)
+
+        assert plan.n_compiles == 2
+        assert plan.is_valid()
+        assert len(opt._last_fovs) == len(plan.fov_blueprints)
+
+    def test_plan_only_depends_on_parameters_read_while_compiling(self,
+                                                                  cmds):
+        opt = OpticalTrain(cmds)
+        plan = opt.compile_plan()
+        assert "!INST.pixel_scale" in plan.dependencies
+        assert "!OBS.dit" not in plan.dependencies
+
+        opt.cmds["!OBS.dit"] = 42
+        assert plan.is_valid()
+        opt.cmds["!INST.pixel_scale"] *= 2
+        assert not plan.is_valid()
+
+    def test_streaming_fovs_give_identical_result_and_keep_footprints(
+            self, chunked_cmds, im_src):
+        opt = OpticalTrain(chunked_cmds)
+        opt.observe(im_src)
+        full_image = np.copy(opt.image_planes[0].data)
+
+        opt.cmds["!SIM.computing.stream_field_of_views"] = True
+        opt.observe(im_src)
+        stream_image = opt.image_planes[0].data
+
+        assert np.array_equal(full_image, stream_image)
+        assert len(opt._last_fovs) > 1
+        for fov in opt._last_fovs:
+            assert fov.hdu is None and fov.fields == []
+            assert fov.volume()["xs"][0] < fov.volume()["xs"][1]
+
+    def test_streamed_fovs_are_only_created_while_observing(self,
+                                                            chunked_cmds,
+                                                            im_src,
+                                                            monkeypatch):
+        chunked_cmds["!SIM.computing.stream_field_of_views"] = True
+        opt = OpticalTrain(chunked_cmds)
+        generate_fovs = FOVManager.generate_fovs
+        n_calls = []
+
+        def _generate_fovs(fov_manager):
+            n_calls.append(1)
+            return generate_fovs(fov_manager)
+
+        monkeypatch.setattr(FOVManager, "generate_fovs", _generate_fovs)
+        opt.observe(im_src)
+
+        assert len(opt._last_fovs) > 1
+        assert len(n_calls) == 1
+
+
+def _cube_hdu():
+    hdu = fits.ImageHDU(data=np.random.random((51, 6, 5)).astype(np.float32))
+    hdu.header.update({"CTYPE1": "RA---TAN", "CTYPE2": "DEC--TAN",
+                       "CTYPE3": "WAVE", "CUNIT1": "arcsec",
+                       "CUNIT2": "arcsec", "CUNIT3": "um", "CDELT1": 0.1,
+                       "CDELT2": 0.1, "CDELT3": 0.02, "CRVAL1": 0,
+                       "CRVAL2": 0, "CRVAL3": 1.0, "CRPIX1": 3, "CRPIX2": 3,
+                       "CRPIX3": 1, "BUNIT": "erg s-1 cm-2 AA-1 arcsec-2"})
+    return hdu
+
+
+@pytest.mark.usefixtures("cmds")
+class TestPrepareSource:
+    def test_cube_is_converted_to_photlam_on_fov_waveset(self, cmds):
+        hdu = _cube_hdu()
+        opt = OpticalTrain(cmds)
+        src = opt.prepare_source(Source(cube=hdu))
+        cube = src.fields[0]
+
+        wave = np.linspace(1., 2., 51) * u.um
+        flux = hdu.data[:, 2, 3] * u.Unit("erg s-1 cm-2 AA-1")
+        flux = flux.to(PHOTLAM, equivalencies=u.spectral_density(wave))
+        cube_wave = cube.header["CRVAL3"] + \
+            cube.header["CDELT3"] * np.arange(cube.data.shape[0])
+
+        inside = (cube_wave > 1.001) * (cube_wave < 1.999)
+
+        assert cube.header["BUNIT"] == "PHOTLAM/arcsec2"
+        assert np.all(cube.data[cube_wave < 0.999, 2, 3] == 0)
+        assert cube.data[inside, 2, 3] == approx(np.interp(
+            cube_wave[inside], wave.value, flux.value), rel=1e-5)
+
+    def test_lazy_mode_leaves_cube_data_to_the_fovs(self, cmds):
+        hdu = _cube_hdu()
+        cmds["!SIM.computing.lazy_cube_resampling"] = True
+        opt = OpticalTrain(cmds)
+        src = Source(cube=hdu)
+        orig_data = src.fields[0].data
+        cube = opt.prepare_source(src).fields[0]
+
+        wave = np.linspace(1., 2., 51) * u.um
+        flux = hdu.data[:, 2, 3] * u.Unit("erg s-1 cm-2 AA-1")
+        flux = flux.to(PHOTLAM, equivalencies=u.spectral_density(wave))
+
+        assert cube.data is orig_data
+        assert cube.header["BUNIT"] == "PHOTLAM/arcsec2"
+        assert cube.data[:, 2, 3] * cube.unit_scale == approx(flux.value,
+                                                              rel=1e-5)
+
+    def test_memmapped_cube_is_resampled_in_slabs_into_memmap(self, cmds,
+                                                              tmp_path):
+        hdu = _cube_hdu()
+        filename = str(tmp_path / "cube.fits")
+        fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(filename)
+
+        opt = OpticalTrain(cmds)
+        in_memory = opt.prepare_source(Source(cube=hdu)).fields[0].data
+
+        opt.cmds["!SIM.computing.cube_slab_size"] = 1e-3
+        on_disk = opt.prepare_source(Source(cube=filename, ext=1))
+        on_disk = on_disk.fields[0].data
+
+        assert isinstance(on_disk, np.memmap)
+        assert np.allclose(on_disk, in_memory)
+
+    def test_throughput_is_applied_in_place_to_resampled_memmap(self, cmds,
+                                                                tmp_path):
+        filename = str(tmp_path / "cube.fits")
+        fits.HDUList([fits.PrimaryHDU(), _cube_hdu()]).writeto(filename)
+        opt = OpticalTrain(cmds)
+        cube = opt.prepare_source(Source(cube=filename, ext=1)).fields[0]
+        data = cube.data
+        expected = 0.5 * np.array(data)
+
+        thru = SpectralElement(Empirical1D, points=[0.3, 3] * u.um,
+                               lookup_table=[0.5, 0.5])
+        cube = apply_throughput_to_cube(cube, thru)
+
+        assert cube.data is data
+        assert isinstance(cube.data, np.memmap)
+        assert np.allclose(cube.data, expected)
+
+
 @pytest.mark.usefixtures("unity_cmds", "unity_src")
 class TestReadout:
     def test_readout_works_when_source_observed(self, unity_cmds, unity_src):
@@ -3,11 +3,13 @@ import pytest
 
 from matplotlib import pyplot as plt
 import numpy as np
+from scipy.interpolate import interp1d
 from synphot import Empirical1D, SourceSpectrum
 from synphot.units import PHOTLAM
 from astropy import units as u
 from astropy.io import fits
 
+from scopesim import rc
 from scopesim.optics import FieldOfView, fov_utils
 from scopesim.optics import image_plane_utils as imp_utils
 
@@ -93,6 +95,58 @@ class TestExtractAreaFromImageHDU:
         assert new_field.header["NAXIS3"] == 51
 
 
+@pytest.mark.usefixtures("cube_source", "basic_fov_header")
+class TestExtractCubeSlab:
+    def _lazy_cube(self, cube_source):
+        field = cube_source.fields[0]
+        field.wave = fov_utils.get_cube_waveset(field.header,
+                                                return_quantity=True)
+        field.unit_scale = 2 * np.ones(field.header["NAXIS3"])
+        field.fov_waveset = np.arange(1.0, 2.0, 1e-3) * u.um
+        field.fov_wave_hdr = {"CTYPE3": "WAVE", "CRPIX3": 1, "CRVAL3": 1.0,
+                              "CDELT3": 1e-3, "CUNIT3": "um"}
+        return field
+
+    def _eager_cube(self, field):
+        """The cube as resampled by a non-lazy prepare_source"""
+        cube_interp = interp1d(field.wave.value, 2 * field.data, axis=0)
+        cube = fits.ImageHDU(data=cube_interp(field.fov_waveset.value),
+                             header=field.header.copy())
+        cube.header.update(field.fov_wave_hdr)
+        return cube
+
+    @pytest.mark.parametrize("waverange", [[1.5, 1.6], [1.2345, 1.5432]])
+    def test_is_identical_to_extracting_from_resampled_cube(
+            self, cube_source, basic_fov_header, waverange):
+        field = self._lazy_cube(cube_source)
+        fov = FieldOfView(basic_fov_header, waverange)
+        lazy = fov_utils.extract_area_from_imagehdu(field, fov.volume())
+        eager = fov_utils.extract_area_from_imagehdu(self._eager_cube(field),
+                                                     fov.volume())
+
+        for key in ["NAXIS3", "CRVAL3", "CRPIX3", "CDELT3", "CUNIT3"]:
+            assert lazy.header[key] == eager.header[key]
+        assert np.allclose(lazy.data, eager.data, rtol=1e-5, atol=0)
+
+    def test_applies_throughput_on_fov_waveset(self, cube_source):
+        field = self._lazy_cube(cube_source)
+        data, _ = fov_utils.extract_cube_slab(field, [1.5, 1.6],
+                                              (10, 20, 30, 35))
+        field.fov_throughput = np.ones(len(field.fov_waveset))
+        field.fov_throughput[field.fov_waveset.value > 1.55] = 0.5
+        thru_data, _ = fov_utils.extract_cube_slab(field, [1.5, 1.6],
+                                                   (10, 20, 30, 35))
+
+        assert thru_data[:20] == approx(data[:20], rel=1e-5)
+        assert thru_data[-20:] == approx(0.5 * data[-20:], rel=1e-5)
+
+    def test_returns_none_if_cube_does_not_cover_fov(self, cube_source):
+        field = self._lazy_cube(cube_source)
+        data, _ = fov_utils.extract_cube_slab(field, [3.0, 3.1],
+                                              (0, 10, 0, 10))
+        assert data is None
+
+
 class TestExtractRangeFromSpectrum:
     def test_extracts_the_wave_range_needed(self):
         wave = np.arange(0.7, 2.5, 0.1) * u.um
@@ -143,4 +197,135 @@ class TestMakeCubeFromTable():
         hdu = fov_utils.make_cube_from_table(fov.fields[0], fov.spectra,
                                              waveset, fov.header)
 
-        assert isinstance(hdu, fits.ImageHDU)
\ No newline at end of file
+        assert isinstance(hdu, fits.ImageHDU)
+
+
+class TestSpectrumCache:
+    def _spec(self):
+        return SourceSpectrum(Empirical1D, points=[0.5, 1.5, 2.5] * u.um,
+                              lookup_table=[1, 2, 3] * PHOTLAM)
+
+    def test_evaluates_each_spectrum_once_per_waveset(self):
+        cache = fov_utils.SpectrumCache()
+        spec1, spec2 = self._spec(), self._spec()
+        wave = np.linspace(0.6, 2.4, 10) * u.um
+        vals1 = cache.evaluate(spec1, wave)
+        vals2 = cache.evaluate(spec1, wave.copy())
+        cache.evaluate(spec2, wave)
+        cache.evaluate(spec1, wave[:5])
+
+        assert vals1 is vals2
+        assert all(vals1 == spec1(wave))
+        assert cache.hits == 1 and cache.misses == 3
+
+    def test_photon_flux_and_extract_range_are_cached(self):
+        cache = fov_utils.SpectrumCache()
+        spec = self._spec()
+        wave = np.linspace(0.6, 2.4, 10) * u.um
+        flux = cache.photon_flux(spec, wave, 1 * u.m**2)
+        sub_spec1 = cache.extract_range(spec, [1, 2] * u.um)
+        sub_spec2 = cache.extract_range(spec, [1, 2] * u.um)
+        cached_flux = cache.photon_flux(spec, wave, 1 * u.m**2)
+
+        fresh_flux = fov_utils.SpectrumCache().photon_flux(spec, wave,
+                                                           1 * u.m**2)
+        fresh_spec = fov_utils.extract_range_from_spectrum(spec,
+                                                           [1, 2] * u.um)
+        assert cached_flux == flux == fresh_flux
+        assert sub_spec1 is sub_spec2
+        assert all(sub_spec2(wave) == fresh_spec(wave))
+        assert cache.hits == 2
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = fov_utils.SpectrumCache(max_size=1000 * 8 * 1.5 / 2**20)
+        spec = self._spec()
+        waves = [np.linspace(0.6, 2.4, 1000) * u.um * f for f in (1, 1.01)]
+        cache.evaluate(spec, waves[0])
+        cache.evaluate(spec, waves[1])
+        cache.evaluate(spec, waves[0])
+
+        assert len(cache) == 1
+        assert cache.misses == 3
+
+    def test_zero_size_cache_stores_nothing(self):
+        cache = fov_utils.SpectrumCache(max_size=0)
+        spec = self._spec()
+        cache.evaluate(spec, [1, 2] * u.um)
+        cache.evaluate(spec, [1, 2] * u.um)
+
+        assert len(cache) == 0
+        assert cache.misses == 2
+
+
+@pytest.mark.usefixtures("basic_fov_header")
+class TestResampledImageCache:
+    def _field(self, data, pixel_scale):
+        hdr = imp_utils.header_from_list_of_xy([-1, 1], [-1, 1],
+                                               pixel_scale / 3600)
+        return fits.ImageHDU(data=data[:hdr["NAXIS2"], :hdr["NAXIS1"]],
+                             header=hdr)
+
+    def test_views_of_the_same_window_are_resampled_once(self,
+                                                         basic_fov_header):
+        data = np.random.random((100, 100))
+        cache = fov_utils.ResampledImageCache()
+        image1 = cache.resample(self._field(data, 0.05), basic_fov_header)
+        image2 = cache.resample(self._field(data, 0.05), basic_fov_header)
+        cache.resample(self._field(data[1:], 0.05), basic_fov_header)
+
+        direct = imp_utils.add_imagehdu_to_imagehdu(
+            self._field(data, 0.05),
+            fits.ImageHDU(data=np.zeros((basic_fov_header["NAXIS2"],
+                                         basic_fov_header["NAXIS1"])),
+                          header=basic_fov_header))
+
+        assert image1 is image2
+        assert not image1.flags.writeable
+        assert image1 == approx(direct.data)
+        assert cache.hits == 1 and cache.misses == 2
+
+    def test_zero_size_cache_stores_nothing(self, basic_fov_header):
+        data = np.random.random((100, 100))
+        cache = fov_utils.ResampledImageCache(max_size=0)
+        cache.resample(self._field(data, 0.05), basic_fov_header)
+        cache.resample(self._field(data, 0.05), basic_fov_header)
+
+        assert len(cache) == 0 and cache.misses == 2
+
+
+class TestTableIndex:
+    def _table(self, n=1000):
+        from astropy.table import Table
+        return Table(data=[np.random.uniform(-10, 10, n) * u.arcsec,
+                           np.random.uniform(-5, 5, n) * u.arcsec,
+                           np.random.randint(0, 3, n)],
+                     names=["x", "y", "ref"])
+
+    @pytest.mark.parametrize("xs, ys", [([-1, 1], [-1, 1]),
+                                        ([-20, 20], [-20, 20]),
+                                        ([2, 9], [-5, 0.3]),
+                                        ([11, 12], [0, 1])])
+    def test_extract_gives_same_rows_as_extract_area_from_table(self, xs,
+                                                                ys):
+        tbl = self._table()
+        volume = {"xs": np.array(xs) / 3600, "ys": np.array(ys) / 3600,
+                  "xy_unit": "deg"}
+        tbl_index = fov_utils.TableIndex(tbl)
+        new_tbl = tbl_index.extract(volume)
+        old_tbl = fov_utils.extract_area_from_table(tbl, volume)
+
+        assert len(new_tbl) == len(old_tbl)
+        assert np.all(new_tbl["x"] == old_tbl["x"])
+        assert np.all(new_tbl["y"] == old_tbl["y"])
+
+    def test_works_for_empty_tables(self):
+        tbl_index = fov_utils.TableIndex(self._table(n=0))
+        assert len(tbl_index.query([-1, 1], [-1, 1])) == 0
+
+    def test_cache_builds_each_index_once(self):
+        cache = fov_utils.TableIndexCache()
+        tbl1, tbl2 = self._table(), self._table()
+
+        assert cache.get(tbl1) is cache.get(tbl1)
+        assert cache.get(tbl2) is not cache.get(tbl1)
+        assert len(cache) == 2
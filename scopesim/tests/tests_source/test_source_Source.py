@@ -20,6 +20,7 @@ from synphot.units import PHOTLAM
 import scopesim as sim
 from scopesim.source import source_utils
 from scopesim.source.source import Source
+from scopesim.effects.ter_curves_utils import apply_throughput_to_cube
 
 from scopesim.optics.image_plane import ImagePlane
 from scopesim.utils import convert_table_comments_to_dict
@@ -249,6 +250,54 @@ class TestSourceAddition:
         assert new_source._meta_dicts[1]["servus"] == "oida"
 
 
+@pytest.mark.usefixtures("table_source", "image_source")
+class TestSourceMakeCopy:
+    def test_copy_shares_data_with_original(self, table_source, image_source):
+        src = table_source + image_source
+        new_src = src.make_copy()
+        assert new_src.fields[0] is not src.fields[0]
+        assert np.shares_memory(new_src.fields[0]["x"], src.fields[0]["x"])
+        assert new_src.fields[1].data is src.fields[1].data
+        assert new_src.spectra[0] is src.spectra[0]
+
+    def test_replacing_spectra_leaves_original_untouched(self, table_source):
+        new_src = table_source.make_copy()
+        new_src.spectra[0] = new_src.spectra[1]
+        assert table_source.spectra[0] is not table_source.spectra[1]
+
+    def test_changing_headers_leaves_original_untouched(self, image_source):
+        new_src = image_source.make_copy()
+        new_src.fields[0].header["SPEC_REF"] = 42
+        assert image_source.fields[0].header["SPEC_REF"] == 0
+
+    def test_appending_leaves_added_source_untouched(self, table_source):
+        refs = np.array(table_source.fields[0]["ref"])
+        new_src = table_source + table_source
+        assert np.all(table_source.fields[0]["ref"] == refs)
+        assert np.all(new_src.fields[1]["ref"] == refs + 3)
+
+    def test_shifting_large_table_leaves_original_untouched(self):
+        n = 2000
+        tbl = Table(names=["x", "y", "ref", "weight"],
+                    data=[np.zeros(n) * u.arcsec, np.zeros(n) * u.arcsec,
+                          np.zeros(n, dtype=int), np.ones(n)])
+        src = Source(table=tbl, spectra=[so._table_source().spectra[0]])
+        new_src = src.make_copy()
+        new_src.shift(dx=1, dy=2)
+        assert np.all(src.fields[0]["x"] == 0)
+        assert np.all(new_src.fields[0]["y"] == 2)
+
+    def test_throughput_on_cube_leaves_original_untouched(self):
+        src = so._cube_source()
+        orig_data = src.fields[0].data.copy()
+        new_src = src.make_copy()
+        thru = SpectralElement(Empirical1D, points=[0.3, 3] * u.um,
+                               lookup_table=[0.5, 0.5])
+        cube = apply_throughput_to_cube(new_src.fields[0], thru)
+        assert np.all(src.fields[0].data == orig_data)
+        assert np.allclose(cube.data, 0.5 * orig_data)
+
+
 @pytest.mark.usefixtures("table_source", "image_source")
 class TestSourceImageInRange:
     def test_returns_an_image_plane_object(self, table_source):
@@ -318,6 +367,42 @@ class TestSourcePhotonsInRange:
         assert np.all(np.isclose(ph.value, [4, 2]))
 
 
+@pytest.mark.usefixtures("table_source")
+class TestSourcePhotonsInBins:
+    def test_returns_matrix_of_spectra_by_bins(self, table_source):
+        ph = table_source.photons_in_bins(np.linspace(1, 2, 11))
+        assert ph.shape == (3, 10)
+        assert ph.unit == u.Unit("ph s-1 m-2")
+
+    def test_bins_add_up_to_photons_in_range(self, table_source):
+        ph_bins = table_source.photons_in_bins([0.7, 1, 1.37, 2, 2.2])
+        for i0, i1 in [(0, 1), (1, 3), (0, 4)]:
+            ph = source_utils.photons_in_range(
+                table_source.spectra, [0.7, 1, 1.37, 2, 2.2][i0],
+                [0.7, 1, 1.37, 2, 2.2][i1])
+            assert np.sum(ph_bins[:, i0:i1], axis=1).value == approx(ph.value)
+
+    def test_photons_in_range_is_sliced_from_bins(self, table_source):
+        table_source.photons_in_bins([1, 1.5, 2] * u.um)
+        table_source._binned_photons["counts"] *= 2
+        ph = table_source.photons_in_range(1 * u.um, 2 * u.um, area=10,
+                                           indexes=[0, 2])
+        assert np.all(np.isclose(ph.value, [80, 40]))
+
+    def test_off_grid_ranges_are_integrated_as_before(self, table_source):
+        ph_orig = table_source.photons_in_range(1, 1.8)
+        table_source.photons_in_bins([1, 1.5, 2])
+        table_source._binned_photons["counts"] *= 2
+        ph = table_source.photons_in_range(1, 1.8)
+        assert np.all(np.isclose(ph.value, ph_orig.value))
+
+    def test_bins_are_ignored_after_spectra_are_replaced(self, table_source):
+        table_source.photons_in_bins([1, 1.5, 2])
+        table_source.spectra[0] = table_source.spectra[1]
+        ph = table_source.photons_in_range(1, 2)
+        assert np.all(np.isclose(ph.value, [2., 2., 2.]))
+
+
 class TestSourceShift:
     def test_that_it_does_what_it_should(self):
         pass
@@ -388,6 +473,43 @@ class TestPhotonsInRange:
         assert counts.value == approx(expected)
 
 
+class TestPhotonsInBins:
+    def test_matches_photons_in_range_for_each_bin(self, input_spectra):
+        edges = np.linspace(1, 2, 7) * u.um
+        counts = source_utils.photons_in_bins(input_spectra, edges)
+        for ii in range(len(edges) - 1):
+            ph = source_utils.photons_in_range(input_spectra, edges[ii],
+                                               edges[ii + 1])
+            assert counts[:, ii].value == approx(ph.value)
+
+    def test_matches_photons_in_range_with_bandpass_and_area(self):
+        wave = np.linspace(0.5, 2.5, 21) * u.um
+        spec = SourceSpectrum(Empirical1D, points=wave,
+                              lookup_table=np.ones(21) * PHOTLAM)
+        bandpass = SpectralElement(Empirical1D, points=[1, 1.5, 2] * u.um,
+                                   lookup_table=[0, 1, 0])
+        counts = source_utils.photons_in_bins([spec], [1, 1.5, 2],
+                                              area=10, bandpass=bandpass)
+        ph = source_utils.photons_in_range([spec], 1, 1.5, area=10,
+                                           bandpass=bandpass)
+        assert counts.unit == u.Unit("ph s-1")
+        assert counts[0, 0].value == approx(ph[0].value)
+
+    def test_throws_error_for_edges_outside_the_bandpass(self):
+        wave = np.linspace(0.5, 2.5, 21) * u.um
+        spec = SourceSpectrum(Empirical1D, points=wave,
+                              lookup_table=np.ones(21) * PHOTLAM)
+        bandpass = SpectralElement(Empirical1D, points=[1, 1.5, 2] * u.um,
+                                   lookup_table=[0, 1, 0])
+        with pytest.raises(ValueError):
+            source_utils.photons_in_bins([spec], [0.8, 1.5],
+                                         bandpass=bandpass)
+
+    def test_throws_error_for_unsorted_edges(self, input_spectra):
+        with pytest.raises(ValueError):
+            source_utils.photons_in_bins(input_spectra, [2, 1])
+
+
 class TestMakeImageFromTable:
     def test_returned_object_is_image_hdu(self):
         hdu = source_utils.make_imagehdu_from_table(x=[0], y=[0], flux=[1])
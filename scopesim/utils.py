@@ -7,7 +7,10 @@ from pathlib import Path
 import sys
 import logging
 import logging
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from docutils.core import publish_string
 from copy import deepcopy
 
@@ -966,6 +969,116 @@ def from_currsys(item):
     return item
 
 
+def get_n_workers(n_workers="!SIM.computing.n_workers"):
+    """
+    Returns the number of worker threads to use for parallel sections
+
+    Parameters
+    ----------
+    n_workers : int, str, optional
+        Default: "!SIM.computing.n_workers". ``None`` or 1 means serial
+        execution, values smaller than 1 use all available CPUs
+
+    Returns
+    -------
+    n_workers : int
+
+    """
+    n_workers = from_currsys(n_workers)
+    if n_workers is None:
+        return 1
+
+    n_workers = int(n_workers)
+    if n_workers < 1:
+        n_workers = os.cpu_count() or 1
+
+    return n_workers
+
+
+_pool_state = threading.local()
+
+
+def _call_in_pool(func, item):
+    _pool_state.in_pool = True
+    return func(item)
+
+
+def parallel_map(func, iterable, n_workers="!SIM.computing.n_workers"):
+    """
+    Lazily maps ``func`` over ``iterable``, optionally on a pool of threads
+
+    The results are always yielded in the order of ``iterable``, regardless of
+    the order in which the workers finish. ``iterable`` is consumed lazily,
+    with at most ``2 * n_workers`` items in flight at any one time.
+
+    A ``parallel_map`` called from inside a worker of another
+    ``parallel_map`` runs serially, so that nested maps (e.g. over the
+    spectral traces of FOVs which are already mapped in parallel) do not
+    multiply the number of threads.
+
+    Parameters
+    ----------
+    func : callable
+    iterable : iterable
+    n_workers : int, str, optional
+        Default: "!SIM.computing.n_workers". See ``get_n_workers``
+
+    Yields
+    ------
+    func(item) for each item in ``iterable``
+
+    """
+    n_workers = get_n_workers(n_workers)
+    if n_workers <= 1 or getattr(_pool_state, "in_pool", False):
+        yield from map(func, iterable)
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = deque()
+            for item in iterable:
+                futures.append(executor.submit(_call_in_pool, func, item))
+                if len(futures) >= 2 * n_workers:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+
+
+class OrderedTurns:
+    """
+    Lets threads through a critical section one at a time, in index order
+
+    Used in ``OpticalTrain.observe_fovs`` and ``DetectorArray.readout`` so
+    that stateful effects see the FOVs (detectors) in exactly the same order
+    as in a serial run::
+
+        >>> turns = OrderedTurns()
+        >>> with turns(i):
+        ...     fov = effect.apply_to(fov)
+
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next = 0
+        self._released = set()
+
+    @contextmanager
+    def __call__(self, i):
+        with self._condition:
+            self._condition.wait_for(lambda: self._next == i)
+        try:
+            yield
+        finally:
+            self.release(i)
+
+    def release(self, i):
+        """Marks index ``i`` as done, without entering the critical section"""
+        with self._condition:
+            self._released.add(i)
+            while self._next in self._released:
+                self._released.remove(self._next)
+                self._next += 1
+            self._condition.notify_all()
+
+
 def check_keys(input_dict, required_keys, action="error", all_any="all"):
     """ Checks to see if all/any of the required keys are present in a dict """
 